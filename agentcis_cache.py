@@ -0,0 +1,132 @@
+import json
+import sqlite3
+import threading
+import time
+
+DEFAULT_CACHE_PATH = "agentcis_cache.sqlite"
+DEFAULT_TTL_SECONDS = 24 * 3600
+DEFAULT_MAX_ENTRIES = 50000
+
+
+class DetailCache:
+    """
+    On-disk TTL cache of projected /api/v2/clients/{id} payloads.
+
+    Entries expire `ttl_seconds` after they were fetched and the file is held to
+    `max_entries` rows by evicting the least recently used ones. When the caller knows the
+    client's current `updated_at` stamp, an entry written for an older stamp is a miss.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, namespace="", ttl_seconds=DEFAULT_TTL_SECONDS,
+                 max_entries=DEFAULT_MAX_ENTRIES, flush_every=200):
+        self.path = path
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.flush_every = flush_every
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._pending = []
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS details (
+                namespace TEXT NOT NULL,
+                id INTEGER NOT NULL,
+                updated_at TEXT,
+                record TEXT NOT NULL,
+                stored_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                PRIMARY KEY (namespace, id)
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS details_accessed_at ON details (accessed_at)")
+        self._conn.commit()
+
+    def get_many(self, versions):
+        """
+        Looks up {client_id: updated_at} and returns {client_id: record} for fresh entries.
+        Pass None as the updated_at to accept any version.
+        """
+        ids = [int(i) for i in versions if i]
+        if not ids:
+            return {}
+        now = time.time()
+        placeholders = ",".join("?" * len(ids))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, updated_at, record, stored_at FROM details WHERE namespace = ? AND id IN ({placeholders})",
+                [self.namespace, *ids],
+            ).fetchall()
+
+            found = {}
+            for client_id, updated_at, record, stored_at in rows:
+                wanted = versions.get(client_id)
+                if now - stored_at > self.ttl_seconds:
+                    continue
+                if wanted is not None and wanted != updated_at:
+                    continue
+                found[client_id] = json.loads(record)
+
+            if found:
+                self._conn.executemany(
+                    "UPDATE details SET accessed_at = ? WHERE namespace = ? AND id = ?",
+                    [(now, self.namespace, client_id) for client_id in found],
+                )
+                self._conn.commit()
+            self.hits += len(found)
+            self.misses += len(ids) - len(found)
+        return found
+
+    def put(self, client_id, updated_at, record):
+        """Queues an entry for writing; pending rows are committed in batches."""
+        now = time.time()
+        with self._lock:
+            self._pending.append((self.namespace, int(client_id), updated_at, json.dumps(record), now, now))
+            if len(self._pending) >= self.flush_every:
+                self._flush_locked()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._pending:
+            return
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO details (namespace, id, updated_at, record, stored_at, accessed_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            self._pending,
+        )
+        self._pending = []
+        self._evict_locked()
+        self._conn.commit()
+
+    def _evict_locked(self):
+        expired = self._conn.execute(
+            "DELETE FROM details WHERE stored_at < ?", [time.time() - self.ttl_seconds]
+        ).rowcount
+        overflow = self._conn.execute("SELECT COUNT(*) FROM details").fetchone()[0] - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM details WHERE rowid IN (SELECT rowid FROM details ORDER BY accessed_at LIMIT ?)",
+                [overflow],
+            )
+        self.evictions += expired + max(overflow, 0)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+        }
+
+    def close(self):
+        self.flush()
+        self._conn.close()
@@ -0,0 +1,186 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+DEFAULT_CHECKPOINT_PATH = "agentcis_checkpoint.jsonl"
+# A checkpoint older than this is from an abandoned run, not one worth resuming
+DEFAULT_MAX_AGE_SECONDS = 24 * 3600
+FLUSH_EVERY = 100
+FLUSH_INTERVAL_SECONDS = 2.0
+# A lock its holder has not refreshed (on every flush) for this long belongs to a dead run
+STALE_LOCK_SECONDS = 120
+
+
+def run_path(path, key):
+    """'agentcis_checkpoint.jsonl' -> 'agentcis_checkpoint-<hash of key>.jsonl', one file per kind of run."""
+    root, extension = os.path.splitext(path)
+    digest = hashlib.blake2b(json.dumps(key, sort_keys=True, default=str).encode(), digest_size=6).hexdigest()
+    return f"{root}-{digest}{extension}"
+
+
+def _minimal_row(client):
+    """The parts of a list row needed to re-enqueue a client without refetching its page."""
+    return {
+        "id": client.get('id'),
+        "full_name": client.get('full_name'),
+        "email": client.get('email'),
+        "updated_at": client.get('updated_at'),
+    }
+
+
+class FetchCheckpoint:
+    """
+    Append-only JSONL log of a fetch in progress, so a crashed run can pick up where it died.
+
+    Line 1 is a header identifying the run (base URL, fields, limit). After that come
+    'page' entries (the list page's meta and minimal client rows) and 'records' entries
+    (finished records keyed by client id). Writes are buffered and flushed every
+    FLUSH_EVERY records or FLUSH_INTERVAL_SECONDS, whichever comes first; a page entry
+    is always written after the records that preceded it, so a torn tail never leaves
+    a page marked done without its records.
+
+    Each kind of run writes its own file (see run_path), so a limited or differently
+    projected fetch never overwrites another's progress, and acquire() takes an exclusive
+    <file>.lock so two processes running the same fetch do not write the same file.
+    """
+
+    def __init__(self, path, key, max_age=DEFAULT_MAX_AGE_SECONDS):
+        self.path = run_path(path, key)
+        self.lock_path = f"{self.path}.lock"
+        self.key = key
+        self.max_age = max_age
+        self.pages = {}
+        self.metas = {}
+        self.records = {}
+        self.resumed = False
+        self._buffer = []
+        self._pending_records = {}
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self._file = None
+        self._locked = False
+
+    def acquire(self):
+        """
+        Creates the lock file; False if another live run holds it. A lock left by a crashed
+        run goes stale after STALE_LOCK_SECONDS and is taken over.
+        """
+        for _ in range(2):
+            try:
+                fd = os.open(self.lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(self.lock_path) < STALE_LOCK_SECONDS:
+                        return False
+                    os.remove(self.lock_path)
+                except FileNotFoundError:
+                    pass
+                continue
+            with os.fdopen(fd, "w") as f:
+                json.dump({"pid": os.getpid(), "started_at": time.time()}, f)
+            self._locked = True
+            return True
+        return False
+
+    def _release(self):
+        if self._locked:
+            self._locked = False
+            try:
+                os.remove(self.lock_path)
+            except FileNotFoundError:
+                pass
+
+    def begin(self, resume):
+        """
+        Loads the previous checkpoint when `resume` is set and it belongs to the same
+        kind of run; otherwise starts a fresh file. Returns True if progress was restored.
+        """
+        if resume and self._load():
+            self.resumed = True
+            self._file = open(self.path, "a", encoding="utf-8")
+        else:
+            self._file = open(self.path, "w", encoding="utf-8")
+            self._write([{"type": "header", **self.key, "started_at": time.time()}])
+        return self.resumed
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path, "r", encoding="utf-8") as f:
+            for i, line in enumerate(f):
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # Torn last line from the crash: keep everything before it
+                    break
+                if i == 0:
+                    header = {k: entry.get(k) for k in self.key}
+                    too_old = time.time() - entry.get("started_at", 0) > self.max_age
+                    if entry.get("type") != "header" or header != self.key or too_old:
+                        return False
+                elif entry["type"] == "page":
+                    self.pages[entry["page"]] = entry["clients"]
+                    if entry.get("meta"):
+                        self.metas[entry["page"]] = entry["meta"]
+                elif entry["type"] == "records":
+                    # JSON object keys are strings; client ids are ints
+                    self.records.update({int(k) if k.isdigit() else k: v for k, v in entry["records"].items()})
+        return bool(self.pages)
+
+    def page_done(self, page, clients, meta=None):
+        with self._lock:
+            self._queue_records()
+            self._buffer.append({"type": "page", "page": page, "meta": meta,
+                                 "clients": [_minimal_row(c) for c in clients]})
+            self._maybe_flush()
+
+    def record(self, client_id, record):
+        with self._lock:
+            self._pending_records[client_id] = record
+            self._maybe_flush()
+
+    def _queue_records(self):
+        if self._pending_records:
+            self._buffer.append({"type": "records", "records": self._pending_records})
+            self._pending_records = {}
+
+    def _maybe_flush(self):
+        if len(self._pending_records) >= FLUSH_EVERY or time.monotonic() - self._last_flush >= FLUSH_INTERVAL_SECONDS:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        self._queue_records()
+        if self._buffer:
+            self._write(self._buffer)
+            self._buffer = []
+        self._last_flush = time.monotonic()
+        if self._locked:
+            # Heartbeat: a held lock stays fresh for as long as the run makes progress
+            try:
+                os.utime(self.lock_path)
+            except FileNotFoundError:
+                pass
+
+    def _write(self, entries):
+        self._file.write("".join(json.dumps(entry, default=str) + "\n" for entry in entries))
+        self._file.flush()
+
+    def flush(self):
+        with self._lock:
+            if self._file is not None:
+                self._flush_locked()
+
+    def close(self, completed=False):
+        """Flushes, closes and releases the lock; a completed run removes its checkpoint."""
+        with self._lock:
+            if self._file is None:
+                self._release()
+                return
+            self._flush_locked()
+            self._file.close()
+            self._file = None
+            if completed and os.path.exists(self.path):
+                os.remove(self.path)
+            self._release()
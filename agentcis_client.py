@@ -1,149 +1,1152 @@
+import asyncio
+import concurrent.futures
+import functools
+import math
+from collections import namedtuple
+import queue as thread_queue
+import threading
+from urllib.parse import urlencode
 import requests
+from requests.adapters import HTTPAdapter
 import json
 import pandas as pd
-from datetime import datetime
 import time
+from agentcis_store import ClientStore
+from agentcis_cache import DetailCache, DEFAULT_CACHE_PATH, DEFAULT_TTL_SECONDS, DEFAULT_MAX_ENTRIES
+from agentcis_limiter import AdaptiveLimiter, THROTTLE_STATUSES, backoff_delay
+from agentcis_replay import RecordedProfile, ReplayArchive, TrafficRecorder
+from agentcis_metrics import FetchMetrics
+from agentcis_checkpoint import FetchCheckpoint, DEFAULT_CHECKPOINT_PATH
+from agentcis_profile import ServerProfile, DEFAULT_PROFILE_PATH
+from agentcis_columns import ColumnBuffer
+from agentcis_decode import DetailDecoder, loads
+
+try:
+    import aiohttp
+except ImportError:  # Optional: falls back to requests on a bounded thread pool
+    aiohttp = None
+
+DEFAULT_CONCURRENCY = 100
+DEFAULT_MAX_RETRIES = 5
+REQUEST_TIMEOUT = 60
+LIST_PAGE_SIZE = 50
+STREAM_BUFFER = 500
+VISA_COLUMNS = ["Client Name", "Visa Type", "Visa Expiry Date", "Email", "Phone"]
+# Request params that may ask /api/v2/clients/list to include detail-only keys (see explore_api.py)
+EXPANSION_PARAMS = ("includes", "fields", "with")
+
+_END_OF_STREAM = object()
+_UNPROBED = object()
+
+
+def _pick(value, subkey):
+    """List rows carry plain strings where the detail payload has objects ({"primary": ...})."""
+    if subkey and isinstance(value, dict):
+        return value.get(subkey)
+    return value
+
+
+class _Field(namedtuple("_Field", ["key", "subkey", "in_list"])):
+    """A report column: where it lives in a client payload and whether list rows carry it."""
+
+    def get(self, row):
+        return _pick(row.get(self.key), self.subkey)
+
+
+# Every client column a report can ask for. Detail-only fields need /api/v2/clients/{id}
+# unless the list endpoint can be asked to expand them server-side.
+CLIENT_FIELDS = {
+    "Client ID": _Field("id", None, True),
+    "Client Name": _Field("full_name", None, True),
+    "Visa Type": _Field("visa_type", None, False),
+    "Visa Expiry Date": _Field("visa_expiry_date", "actual", False),
+    "Email": _Field("email", "primary", True),
+    "Phone": _Field("phone", "formatted", True),
+    "Updated At": _Field("updated_at", "actual", True),
+}
+
+# Lead Report layout, flattened from /api/v2/applications rows: column -> extractor(row, client)
+APPLICATION_FIELDS = {
+    "Application ID": lambda row, client: row.get('application_id') or row.get('id'),
+    "Status": lambda row, client: _pick(row.get('status'), 'label'),
+    "Workflow Name": lambda row, client: _pick(row.get('workflow'), 'name'),
+    "Application Owner": lambda row, client: _pick(row.get('application_owner'), 'name'),
+    "Internal Client ID": lambda row, client: client.get('id'),
+    "Client Name": lambda row, client: client.get('name'),
+    "Client Email": lambda row, client: client.get('email'),
+    "Product": lambda row, client: _pick(row.get('product'), 'name'),
+    "Partner": lambda row, client: _pick(row.get('partner'), 'name'),
+    "Current Stage": lambda row, client: _pick(row.get('current_stage'), 'name'),
+    "Last Updated": lambda row, client: _pick(row.get('updated_at'), 'formatted'),
+    "Created": lambda row, client: _pick(row.get('created_at'), 'formatted'),
+}
+APPLICATION_COLUMNS = list(APPLICATION_FIELDS)
+APPLICATION_PAGE_SIZES = (1000, 500, 200, 100, 50)
+PAGE_SIZE_PARAMS = ("per_page", "limit")
+
+
+def _flatten_applications(rows, columns=APPLICATION_COLUMNS):
+    """Flattens application rows into per-column lists (status, workflow, owner and client unnested)."""
+    extractors = [(name, APPLICATION_FIELDS[name]) for name in columns]
+    flat = {name: [] for name in columns}
+    for row in rows:
+        client = row.get('client') or {}
+        for name, extract in extractors:
+            flat[name].append(extract(row, client))
+    return flat
+
+
+FieldPlan = namedtuple("FieldPlan", ["fields", "needs_detail", "expansion_param", "expansion_keys"])
+
+
+def _project(row, fields):
+    return {name: CLIENT_FIELDS[name].get(row) for name in fields}
+
+
+def _project_row(row, fields):
+    """Like _project, as a tuple in `fields` order: the compact form records travel in internally."""
+    return tuple(CLIENT_FIELDS[name].get(row) for name in fields)
+
+
+class _Response:
+    """Minimal response shared by both transports (mirrors requests.Response)."""
+    __slots__ = ("status_code", "content", "headers")
+
+    def __init__(self, status_code, content, headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self):
+        return loads(self.content)
+
+
+class _AiohttpTransport:
+    """Non-blocking transport: one pooled keep-alive connector shared by all requests."""
+
+    def __init__(self, headers, concurrency, stats):
+        self.headers = headers
+        self.concurrency = concurrency
+        self.stats = stats
+        self._session = None
+
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(limit=self.concurrency, limit_per_host=self.concurrency)
+        self._session = aiohttp.ClientSession(
+            headers=self.headers,
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT),
+            trace_configs=[self._trace_config()],
+        )
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self._session.close()
+
+    def _trace_config(self):
+        stats = self.stats
+
+        async def on_request_end(session, ctx, params):
+            stats["requests"] += 1
+
+        async def on_connection_create_end(session, ctx, params):
+            stats["connections_opened"] += 1
+
+        async def on_connection_reuseconn(session, ctx, params):
+            stats["connections_reused"] += 1
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_end.append(on_request_end)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        return trace_config
+
+    async def request(self, method, url, json_body=None):
+        async with self._session.request(method, url, json=json_body) as res:
+            return _Response(res.status, await res.read(), res.headers)
+
+
+class _ThreadTransport:
+    """Fallback transport when aiohttp is not installed: pooled session calls on a bounded executor."""
+
+    def __init__(self, session, concurrency):
+        self.session = session
+        self.concurrency = concurrency
+        self._executor = None
+
+    async def __aenter__(self):
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.concurrency)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self._executor.shutdown(wait=True)
+
+    async def request(self, method, url, json_body=None):
+        loop = asyncio.get_running_loop()
+        call = functools.partial(self.session.request, method, url, json=json_body, timeout=REQUEST_TIMEOUT)
+        res = await loop.run_in_executor(self._executor, call)
+        return _Response(res.status_code, res.content, res.headers)
+
+
+class _ReplayTransport:
+    """Offline transport: serves every request from a recorded archive, never the network."""
+
+    def __init__(self, archive):
+        self.archive = archive
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+    async def request(self, method, url, json_body=None):
+        recorded = self.archive.lookup(method, url, json_body)
+        if recorded is None:
+            return _Response(404, b'{"message": "Request not found in replay archive"}')
+        return _Response(*recorded)
+
+
+class _FetchRun:
+    """Per-fetch state shared by the list pager and the detail workers."""
+
+    def __init__(self, transport, limiter, report):
+        self.transport = transport
+        self.limiter = limiter
+        self.report = report
+        self.retries = 0
+        self.failed = []
+        self.plan = None
+        self.metrics = FetchMetrics()
+        self.checkpoint = None
+
+
+def _select_row(record, fields):
+    """Narrows a stored full projection to the requested fields, as a tuple in `fields` order."""
+    return tuple(record.get(name) for name in fields)
+
+
+def _updated_at(client):
+    """The list row's last-modified stamp, used as the incremental sync version."""
+    return (client.get('updated_at') or {}).get('actual')
+
+
+def _run_sync(coro):
+    """Runs a coroutine to completion from synchronous code, even inside a thread with a running loop."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coro).result()
+
+
+def _iter_in_thread(open_stream, progress_callback=None, data_callback=None):
+    """
+    Drives an async record stream from synchronous code, as a generator.
+
+    `open_stream(progress_callback, data_callback)` must return the async iterator. It runs
+    on an event loop in a background thread; records and callback invocations are handed
+    back through a bounded queue, so the callbacks still run on the caller's thread
+    (Streamlit elements can only be updated from the script thread).
+    Stopping iteration early cancels the remaining fetch.
+    """
+    items = thread_queue.Queue(maxsize=STREAM_BUFFER)
+    stop = threading.Event()
+
+    async def offer(kind, payload):
+        # Never block the event loop on a full queue; yield to the fetch instead
+        while not stop.is_set():
+            try:
+                items.put_nowait((kind, payload))
+                return
+            except thread_queue.Full:
+                await asyncio.sleep(0.01)
+
+    async def pump():
+        callbacks = []
+        def relay(kind):
+            def callback(payload):
+                # Hand over immediately when possible, keeping order with anything backed up
+                if not callbacks:
+                    try:
+                        items.put_nowait((kind, payload))
+                        return
+                    except thread_queue.Full:
+                        pass
+                callbacks.append((kind, payload))
+            return callback
+
+        try:
+            async for record in open_stream(
+                relay("progress") if progress_callback else None,
+                relay("data") if data_callback else None,
+            ):
+                while callbacks:
+                    await offer(*callbacks.pop(0))
+                await offer("record", record)
+                if stop.is_set():
+                    return
+            while callbacks:
+                await offer(*callbacks.pop(0))
+            await offer("done", None)
+        except Exception as e:
+            await offer("error", e)
+
+    thread = threading.Thread(target=asyncio.run, args=(pump(),), daemon=True)
+    thread.start()
+    try:
+        while True:
+            kind, payload = items.get()
+            if kind == "record":
+                yield payload
+            elif kind == "progress":
+                progress_callback(payload)
+            elif kind == "data":
+                data_callback(payload)
+            elif kind == "error":
+                raise payload
+            else:
+                break
+    finally:
+        stop.set()
+        thread.join()
+
 
 class AgentcisClient:
-    def __init__(self, api_token, base_url):
+    def __init__(self, api_token, base_url, concurrency=DEFAULT_CONCURRENCY, store_path=None,
+                 cache_path=None, cache_ttl=DEFAULT_TTL_SECONDS, cache_max_entries=DEFAULT_MAX_ENTRIES,
+                 max_retries=DEFAULT_MAX_RETRIES, field_expansion=_UNPROBED, record_path=None, replay_path=None,
+                 metrics_path=None, checkpoint_path=None, json_backend=None, profile_path=None):
         self.api_token = api_token
         self.base_url = base_url.rstrip('/')
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        # List param that expands detail-only fields server-side; probed on first use
+        self.field_expansion = field_expansion
+        # Record every exchange to an archive, or serve a whole run from one with no network
+        self.recorder = TrafficRecorder(record_path) if record_path else None
+        self.replay = ReplayArchive(replay_path) if replay_path else None
+        # Probe results kept across runs; a replayed run takes the answers its recording used
+        if self.replay:
+            self.profile = RecordedProfile(self.replay)
+        else:
+            self.profile = ServerProfile(profile_path, namespace=self.base_url) if profile_path else None
+        # Page-size params negotiated with /api/v2/applications, reused on later syncs
+        self._applications_params = self.profile.get("applications_params") if self.profile else None
+        # Optional callable(method, url, status, elapsed_seconds) invoked after every attempt;
+        # status is None when the attempt raised (timeouts, connection errors)
+        self.request_hook = None
+        # FetchMetrics of the most recent run; also written as Prometheus text when metrics_path is set
+        self.last_metrics = None
+        self.metrics_path = metrics_path
+        # Progress log for visa fetches, so resume=True can continue a run that died part-way
+        self.checkpoint_path = checkpoint_path
+        # Detail payloads are decoded only as far as the catalog keys (msgspec > orjson > json)
+        self.detail_decoder = DetailDecoder({field.key for field in CLIENT_FIELDS.values()}, backend=json_backend)
+        # Set by MultiTenantClient: a FairShareBudget shared with other tenants, and this tenant's name
+        self.budget = None
+        self.tenant = None
+        # Incremental sync: reuse stored details for clients whose updated_at is unchanged
+        self.store = ClientStore(store_path, namespace=self.base_url) if store_path else None
+        # Short-lived detail cache so repeat runs on the same day skip the network. The store
+        # already serves every unchanged client, so with one configured the cache is not opened
+        # (it would only write each detail to SQLite a second time)
+        self.cache = DetailCache(
+            cache_path, namespace=self.base_url, ttl_seconds=cache_ttl, max_entries=cache_max_entries
+        ) if cache_path and not store_path else None
         self.headers = {
             "Authorization": f"Bearer {self.api_token}",
             "Content-Type": "application/json",
             "Accept": "application/json"
         }
+        # Keep-alive connection pool for blocking calls, sized to the worker count
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        self._pool_size = 0
+        self._resize_pool(concurrency)
+        # Connection counters for the aiohttp transport (requests pools keep their own)
+        self._aiohttp_stats = {"requests": 0, "connections_opened": 0, "connections_reused": 0}
 
-    def fetch_visa_data(self, limit=None, progress_callback=None, data_callback=None):
+    @classmethod
+    def from_config(cls, config):
+        """
+        Builds a client from the agentcis_* keys in config.json.
+        The detail cache (unless agentcis_store_path is set), fetch checkpoint and server
+        profile are on by default; set agentcis_cache_path, agentcis_checkpoint_path or
+        agentcis_profile_path to null to disable them. A replay (agentcis_replay_path) never
+        uses the detail cache, so every record comes from the archive.
+        """
+        replay_path = config.get("agentcis_replay_path")
+        return cls(
+            config["agentcis_api_token"],
+            config["agentcis_base_url"],
+            concurrency=config.get("agentcis_concurrency", DEFAULT_CONCURRENCY),
+            store_path=config.get("agentcis_store_path"),
+            cache_path=None if replay_path else config.get("agentcis_cache_path", DEFAULT_CACHE_PATH),
+            cache_ttl=config.get("agentcis_cache_ttl_hours", DEFAULT_TTL_SECONDS / 3600) * 3600,
+            cache_max_entries=config.get("agentcis_cache_max_entries", DEFAULT_MAX_ENTRIES),
+            max_retries=config.get("agentcis_max_retries", DEFAULT_MAX_RETRIES),
+            field_expansion=config.get("agentcis_field_expansion", _UNPROBED),
+            record_path=config.get("agentcis_record_path"),
+            replay_path=replay_path,
+            metrics_path=config.get("agentcis_metrics_path"),
+            checkpoint_path=config.get("agentcis_checkpoint_path", DEFAULT_CHECKPOINT_PATH),
+            json_backend=config.get("agentcis_json_backend"),
+            profile_path=config.get("agentcis_profile_path", DEFAULT_PROFILE_PATH),
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.session.close()
+        if self.store:
+            self.store.close()
+        if self.cache:
+            self.cache.close()
+        if self.recorder:
+            self.recorder.close()
+
+    def _resize_pool(self, pool_size):
+        if pool_size <= self._pool_size:
+            return
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._pool_size = pool_size
+
+    def connection_stats(self):
+        """
+        Returns request and connection counts across both transports.
+        `connections_reused` is how many requests were served on an already-open
+        keep-alive connection instead of paying a new TCP+TLS handshake.
+        """
+        stats = dict(self._aiohttp_stats)
+        for adapter in set(self.session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                stats["requests"] += pool.num_requests
+                stats["connections_opened"] += pool.num_connections
+                stats["connections_reused"] += max(pool.num_requests - pool.num_connections, 0)
+        return stats
+
+    def fetch_visa_data(self, limit=None, progress_callback=None, data_callback=None, concurrency=None, resume=False):
         """
         Fetches clients and their detailed visa information.
-        Uses ThreadPoolExecutor for parallel fetching to speed up the process.
+        Synchronous wrapper around fetch_visa_data_async so existing callers keep working.
         """
-        import concurrent.futures
+        return _run_sync(self.fetch_visa_data_async(
+            limit=limit,
+            progress_callback=progress_callback,
+            data_callback=data_callback,
+            concurrency=concurrency,
+            resume=resume,
+        ))
+
+    async def fetch_visa_data_async(self, limit=None, progress_callback=None, data_callback=None, concurrency=None,
+                                    resume=False):
+        """
+        Fetches clients and their detailed visa information on an asyncio event loop
+        and collects them into a DataFrame. See aiter_visa_records for the fetch itself.
+        """
+        return await self.fetch_client_data_async(
+            VISA_COLUMNS,
+            limit=limit,
+            progress_callback=progress_callback,
+            data_callback=data_callback,
+            concurrency=concurrency,
+            resume=resume,
+        )
+
+    def fetch_client_data(self, fields, limit=None, progress_callback=None, data_callback=None, concurrency=None,
+                          resume=False):
+        """Fetches `fields` (names from CLIENT_FIELDS) for every client as a DataFrame."""
+        return _run_sync(self.fetch_client_data_async(
+            fields,
+            limit=limit,
+            progress_callback=progress_callback,
+            data_callback=data_callback,
+            concurrency=concurrency,
+            resume=resume,
+        ))
+
+    async def fetch_client_data_async(self, fields, limit=None, progress_callback=None, data_callback=None,
+                                      concurrency=None, resume=False):
+        """
+        Collects aiter_client_records(fields) into a DataFrame with one column per field.
+        The run's telemetry is attached as df.attrs["fetch_metrics"] (see FetchMetrics.to_dict).
+        Rows are accumulated column by column (Visa Type as a categorical), never as dicts.
+        """
+        buffer = ColumnBuffer(fields, categorical=("Visa Type",))
+        async for row in self._aiter_rows(
+            fields,
+            limit=limit,
+            progress_callback=progress_callback,
+            data_callback=data_callback,
+            concurrency=concurrency,
+            resume=resume,
+        ):
+            buffer.append(row)
+        df = buffer.to_frame()
+        df.attrs["fetch_metrics"] = self.last_metrics.to_dict()
+        return df
+
+    async def aiter_visa_records(self, limit=None, progress_callback=None, data_callback=None, concurrency=None,
+                                 resume=False):
+        """Yields projected visa records (tuples in VISA_COLUMNS order) as they complete."""
+        async for record in self.aiter_client_records(
+            VISA_COLUMNS,
+            limit=limit,
+            progress_callback=progress_callback,
+            data_callback=data_callback,
+            concurrency=concurrency,
+            resume=resume,
+        ):
+            yield record
+
+    def plan_fields(self, fields, expansion_param=None):
+        """
+        Works out which endpoints are needed to produce `fields` (names from CLIENT_FIELDS).
+        Detail calls are skipped when every field is in the list payload, or when
+        `expansion_param` can make the list endpoint include the detail-only ones.
+        """
+        unknown = [name for name in fields if name not in CLIENT_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown client fields: {unknown}")
+
+        detail_keys = sorted({CLIENT_FIELDS[name].key for name in fields if not CLIENT_FIELDS[name].in_list})
+        if not detail_keys:
+            return FieldPlan(list(fields), False, None, [])
+        if expansion_param:
+            return FieldPlan(list(fields), False, expansion_param, detail_keys)
+        return FieldPlan(list(fields), True, None, [])
+
+    async def probe_field_expansion(self, run, keys):
+        """
+        Asks the list endpoint for one row with each EXPANSION_PARAMS candidate and returns the
+        first param whose row comes back carrying all `keys` as well as the usual list keys
+        (a param that swaps the row for just the requested keys would break pagination), or
+        None. The answer is kept on the client and in its server profile per set of keys;
+        set agentcis_field_expansion in config.json to skip the probe.
+        """
+        param = await self._probe_field_expansion(run, keys)
+        if self.recorder:
+            # However it was answered, a replay of this run must take the same path
+            self.recorder.note("field_expansion", {",".join(keys): param})
+        return param
+
+    async def _probe_field_expansion(self, run, keys):
+        if self.field_expansion is not _UNPROBED:
+            return self.field_expansion or None
+
+        probed = self.profile.get("field_expansion", {}) if self.profile else {}
+        profile_key = ",".join(keys)
+        if profile_key in probed:
+            self.field_expansion = probed[profile_key]
+            return self.field_expansion
 
-        if progress_callback:
-            progress_callback("Fetching client list from Agentcis...")
-        else:
-            print("Fetching client list from Agentcis...")
-            
         clients_url = f"{self.base_url}/api/v2/clients/list"
-        
-        all_clients = []
-        page = 1
-        has_more = True
-        
-        # 1. Fetch all clients (Pagination)
-        while has_more:
+        required = list(keys) + sorted({field.key for field in CLIENT_FIELDS.values() if field.in_list})
+        answered = False
+        self.field_expansion = None
+        for param in EXPANSION_PARAMS:
             try:
-                msg = f"Fetching client list page {page}..."
-                if progress_callback: progress_callback(msg)
-                else: print(msg)
-
-                payload = {"page": page, "limit": 50} 
-                response = requests.post(clients_url, headers=self.headers, json=payload)
-                
+                response = await self._request(run, "POST", clients_url, json_body={"page": 1, "limit": 1, param: keys})
                 if response.status_code == 200:
-                    data = response.json()
-                    current_batch = data.get('data', [])
-                    
-                    if not current_batch:
+                    rows = response.json().get('data', [])
+                    # An empty list proves nothing either way
+                    answered = answered or bool(rows)
+                    if rows and all(key in rows[0] for key in required):
+                        self.field_expansion = param
                         break
-                        
-                    all_clients.extend(current_batch)
-                    
-                    # Send batch to UI for visualization
-                    if data_callback:
-                        # Extract just a few fields for the preview table
-                        preview_data = []
-                        for c in current_batch:
-                            preview_data.append({
-                                "ID": c.get('id'),
-                                "Name": c.get('full_name'),
-                                "Email": c.get('email')
-                            })
-                        data_callback(preview_data)
-                    
-                    meta = data.get('meta', {})
-                    if page >= meta.get('last_page', 1):
-                        has_more = False
+            except Exception as e:
+                run.report(f"Field expansion probe with '{param}' failed: {e}")
+        if self.profile and answered:
+            self.profile.set("field_expansion", {**probed, profile_key: self.field_expansion})
+        return self.field_expansion
+
+    async def _resolve_plan(self, run, fields):
+        plan = self.plan_fields(fields)
+        if plan.needs_detail:
+            detail_keys = sorted({CLIENT_FIELDS[name].key for name in fields if not CLIENT_FIELDS[name].in_list})
+            expansion_param = await self.probe_field_expansion(run, detail_keys)
+            if expansion_param:
+                plan = self.plan_fields(fields, expansion_param)
+
+        if not plan.needs_detail:
+            how = f"list rows expanded via '{plan.expansion_param}'" if plan.expansion_param else "list rows"
+            run.report(f"All requested fields come from {how}; skipping per-client detail calls.")
+        return plan
+
+    async def aiter_client_records(self, fields, limit=None, progress_callback=None, data_callback=None, concurrency=None,
+                                   resume=False):
+        """
+        Yields records with the requested `fields` (names from CLIENT_FIELDS) as they complete,
+        each a tuple in `fields` order (dict(zip(fields, row)) for a mapping), so a consumer can
+        append them straight to a ColumnBuffer. The projection planner decides whether
+        per-client detail calls are needed at all.
+
+        At most `concurrency` requests are in flight, all sharing one pooled connection set,
+        so raising concurrency costs coroutines rather than OS threads. The in-flight cap
+        adapts below that ceiling when Agentcis throttles, and failed calls are retried.
+        Detail workers start on each list page as soon as it lands.
+        With a local store configured, only new or changed clients are fetched.
+        A slow consumer applies backpressure: workers pause once STREAM_BUFFER records are waiting.
+        Per-endpoint telemetry for the run is available as self.last_metrics.
+
+        With a checkpoint path configured, finished pages and records are logged as they
+        complete. `resume=True` restores them from the last checkpoint of the same fetch
+        (same base URL, fields and limit): restored records are yielded without requests and
+        only unfinished pages and clients are fetched. The checkpoint is removed on completion.
+        """
+        async for row in self._aiter_rows(
+            fields,
+            limit=limit,
+            progress_callback=progress_callback,
+            data_callback=data_callback,
+            concurrency=concurrency,
+            resume=resume,
+        ):
+            yield row
+
+    async def _aiter_rows(self, fields, limit=None, progress_callback=None, data_callback=None, concurrency=None,
+                          resume=False):
+        """The fetch behind aiter_client_records, yielding rows as tuples in `fields` order."""
+        concurrency = concurrency or self.concurrency
+        report = self._reporter(progress_callback)
+
+        progress = {"listed": 0, "completed": 0, "unchanged": 0, "resumed": 0}
+        queue = asyncio.Queue()
+        results = asyncio.Queue(maxsize=STREAM_BUFFER)
+
+        async def emit(client_id, record):
+            await results.put(record)
+            if run.checkpoint:
+                run.checkpoint.record(client_id, record)
+            progress["completed"] += 1
+
+        async def enqueue(batch):
+            progress["listed"] += len(batch)
+            if run.checkpoint and run.checkpoint.records:
+                restored = run.checkpoint.records
+                remaining = []
+                for client in batch:
+                    record = restored.pop(client.get('id'), None)
+                    if record is None:
+                        remaining.append(client)
                     else:
-                        page += 1
-                        
-                    if limit and len(all_clients) >= limit:
-                        all_clients = all_clients[:limit]
-                        break
+                        await results.put(tuple(record))
+                        progress["resumed"] += 1
+                        progress["completed"] += 1
+                batch = remaining
+
+            if not run.plan.needs_detail:
+                for client in batch:
+                    await emit(client.get('id'), _project_row(client, fields))
+                return
+
+            known = self.store.lookup([c.get('id') for c in batch]) if self.store else {}
+            to_fetch = []
+            for client in batch:
+                stored = known.get(client.get('id'))
+                if stored and stored[0] == _updated_at(client):
+                    progress["unchanged"] += 1
+                    await emit(client.get('id'), _select_row(stored[1], fields))
                 else:
-                    msg = f"Error fetching list: {response.text}"
-                    if progress_callback: progress_callback(msg)
-                    else: print(msg)
-                    break
-            except Exception as e:
-                msg = f"Exception fetching list: {e}"
-                if progress_callback: progress_callback(msg)
-                else: print(msg)
+                    to_fetch.append(client)
+
+            cached = self.cache.get_many({c.get('id'): _updated_at(c) for c in to_fetch}) if self.cache else {}
+            for client in to_fetch:
+                record = cached.get(client.get('id'))
+                if record:
+                    await emit(client.get('id'), _select_row(record, fields))
+                else:
+                    queue.put_nowait(client)
+
+        async with self._open_transport(concurrency) as transport:
+            run = _FetchRun(transport, AdaptiveLimiter(concurrency), report)
+            self.last_metrics = run.metrics
+            run.metrics.phase_start("total")
+            if self.checkpoint_path:
+                checkpoint = FetchCheckpoint(
+                    self.checkpoint_path, {"base_url": self.base_url, "fields": list(fields), "limit": limit}
+                )
+                if checkpoint.acquire():
+                    run.checkpoint = checkpoint
+                else:
+                    report("Another run of this fetch holds its checkpoint; continuing without one.")
+            try:
+                if run.checkpoint and run.checkpoint.begin(resume):
+                    report(
+                        f"Resuming from checkpoint: {len(run.checkpoint.pages)} list pages and "
+                        f"{len(run.checkpoint.records)} records restored."
+                    )
+                run.plan = await self._resolve_plan(run, fields)
+            except BaseException:
+                if run.checkpoint:
+                    run.checkpoint.close()
+                raise
+            workers = [
+                asyncio.create_task(self._detail_worker(run, queue, results, progress))
+                for _ in range(concurrency if run.plan.needs_detail else 0)
+            ]
+
+            async def produce():
+                try:
+                    await self._fetch_client_list(run, limit, data_callback, on_page=enqueue)
+                finally:
+                    for _ in workers:
+                        queue.put_nowait(None)
+                    await asyncio.gather(*workers)
+                    if self.store:
+                        self.store.flush()
+                    if self.cache:
+                        self.cache.flush()
+                    await results.put(_END_OF_STREAM)
+
+            producer = asyncio.create_task(produce())
+            completed = False
+            try:
+                while True:
+                    record = await results.get()
+                    if record is _END_OF_STREAM:
+                        break
+                    yield record
+                await producer
+                completed = True
+            finally:
+                if run.checkpoint:
+                    # Kept (and flushed) unless the whole fetch finished
+                    run.checkpoint.close(completed=completed)
+                # Consumer stopped early (or failed): tear the fan-out down
+                if not producer.done():
+                    producer.cancel()
+                    for worker in workers:
+                        worker.cancel()
+                    await asyncio.gather(producer, *workers, return_exceptions=True)
+                run.metrics.phase_end("total")
+
+        report(f"Processed {progress['completed']}/{progress['listed']} clients.")
+        if progress["resumed"]:
+            report(f"Resumed: {progress['resumed']} records came from the checkpoint without any requests.")
+        report(
+            f"Adaptive concurrency: limit {run.limiter.limit:.0f}/{concurrency} "
+            f"(lowest {run.limiter.lowest:.0f}), {run.retries} retries."
+        )
+        if run.failed:
+            report(f"Warning: {len(run.failed)} clients could not be fetched after retries: {run.failed[:20]}")
+        if self.store:
+            report(
+                f"Incremental sync: {progress['unchanged']} unchanged clients served from the local store, "
+                f"{progress['listed'] - progress['unchanged']} needed a detail fetch."
+            )
+        if self.cache:
+            cache_stats = self.cache.stats()
+            report(
+                f"Detail cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses "
+                f"({cache_stats['hit_rate']:.0%} hit rate)."
+            )
+        stats = self.connection_stats()
+        report(
+            f"Connections: {stats['connections_opened']} opened, "
+            f"{stats['connections_reused']} reused over {stats['requests']} requests."
+        )
+        self._finish_metrics(run, report)
+        self._finish_traffic_archive(report)
+
+    def iter_visa_records(self, limit=None, progress_callback=None, data_callback=None, concurrency=None, resume=False):
+        """Synchronous generator of projected visa records (tuples in VISA_COLUMNS order)."""
+        return self.iter_client_records(
+            VISA_COLUMNS,
+            limit=limit,
+            progress_callback=progress_callback,
+            data_callback=data_callback,
+            concurrency=concurrency,
+            resume=resume,
+        )
+
+    def iter_client_records(self, fields, limit=None, progress_callback=None, data_callback=None, concurrency=None,
+                            resume=False):
+        """
+        Synchronous generator over aiter_client_records (see _iter_in_thread). Callbacks run
+        on the caller's thread, and stopping iteration early cancels the remaining fetch.
+        """
+        return _iter_in_thread(
+            lambda progress, data: self.aiter_client_records(
+                fields,
+                limit=limit,
+                progress_callback=progress,
+                data_callback=data,
+                concurrency=concurrency,
+                resume=resume,
+            ),
+            progress_callback,
+            data_callback,
+        )
+
+    def fetch_applications(self, progress_callback=None, concurrency=None, columns=None):
+        """Fetches every application as a flat DataFrame (see fetch_applications_async)."""
+        return _run_sync(self.fetch_applications_async(
+            progress_callback=progress_callback, concurrency=concurrency, columns=columns,
+        ))
+
+    async def fetch_applications_async(self, progress_callback=None, concurrency=None, columns=None):
+        """
+        Bulk-syncs /api/v2/applications into a DataFrame with APPLICATION_COLUMNS, the
+        layout process_application_report expects from a manual export.
+        Page 1 negotiates the largest page size the server accepts; the remaining pages are
+        then fetched concurrently and flattened column by column, in page order.
+        `columns` (names from APPLICATION_FIELDS) limits the flattening to what a report needs.
+        The run's telemetry is attached as df.attrs["fetch_metrics"].
+        """
+        concurrency = concurrency or self.concurrency
+        columns = list(columns or APPLICATION_COLUMNS)
+        report = self._reporter(progress_callback)
+        report("Fetching applications from Agentcis...")
+
+        async with self._open_transport(concurrency) as transport:
+            run = _FetchRun(transport, AdaptiveLimiter(concurrency), report)
+            self.last_metrics = run.metrics
+            run.metrics.phase_start("total")
+            run.metrics.phase_start("pagination")
+            negotiated = await self._negotiate_applications_page(run)
+            if negotiated is None:
+                report("Could not fetch applications.")
+                return pd.DataFrame(columns=columns)
+            params, first = negotiated
+
+            meta = first.get('meta', {})
+            last_page = meta.get('last_page', 1)
+            report(
+                f"Found {meta.get('total', len(first.get('data', [])))} applications across {last_page} pages "
+                f"of {meta.get('per_page')}. Fetching remaining pages concurrently..."
+            )
+
+            pages = {1: _flatten_applications(first.get('data', []), columns)}
+            tasks = [
+                asyncio.create_task(self._fetch_applications_page(run, params, page))
+                for page in range(2, last_page + 1)
+            ]
+            for next_result in asyncio.as_completed(tasks):
+                page, rows = await next_result
+                pages[page] = _flatten_applications(rows, columns)
+                if len(pages) % 10 == 0 or len(pages) == last_page:
+                    report(f"Fetched applications page {len(pages)}/{last_page}...")
+            run.metrics.phase_end("pagination")
+
+        flat = {name: [] for name in columns}
+        for page in sorted(pages):
+            for name, values in pages[page].items():
+                flat[name].extend(values)
+        df = pd.DataFrame(flat, columns=columns)
+        run.metrics.phase_end("total")
+        df.attrs["fetch_metrics"] = run.metrics.to_dict()
+        report(f"Fetched {len(df)} applications ({run.retries} retries).")
+        self._finish_metrics(run, report)
+        self._finish_traffic_archive(report)
+        return df
+
+    def _finish_metrics(self, run, report):
+        """Reports the run's per-endpoint telemetry and writes the Prometheus file if configured."""
+        for line in run.metrics.summary():
+            report(line)
+        if self.metrics_path:
+            try:
+                run.metrics.write_prometheus(self.metrics_path)
+            except OSError as e:
+                report(f"Could not write fetch metrics to {self.metrics_path}: {e}")
+
+    def _finish_traffic_archive(self, report):
+        """Closes this run's recording (so the archive is complete on disk) and reports replay misses."""
+        if self.recorder:
+            self.recorder.close()
+            report(f"Recorded {self.recorder.count} exchanges to {self.recorder.path}.")
+        if self.replay:
+            report(f"Replayed {self.replay.served} exchanges from {self.replay.path} ({self.replay.missing} not in archive).")
+
+    async def _negotiate_applications_page(self, run):
+        """
+        Requests page 1 under each PAGE_SIZE_PARAMS name, starting at the largest
+        APPLICATION_PAGE_SIZES entry, and keeps the largest page the server returns
+        (meta.per_page). Smaller sizes are only tried after an error: a page that comes back
+        smaller than asked is the server's cap, which no smaller request can beat. Returns
+        (params, page 1 JSON), or None if no attempt succeeded. The winning params are
+        remembered on the client and in its server profile.
+        """
+        if self._applications_params:
+            data = await self._get_applications_json(run, {**self._applications_params, "page": 1})
+            if data is not None:
+                if self.recorder:
+                    self.recorder.note("applications_params", self._applications_params)
+                return self._applications_params, data
+
+        best = None
+        honoured = False
+        for param in PAGE_SIZE_PARAMS:
+            for size in APPLICATION_PAGE_SIZES:
+                data = await self._get_applications_json(run, {param: size, "page": 1})
+                if data is None:
+                    continue
+                per_page = int(data.get('meta', {}).get('per_page') or len(data.get('data', [])))
+                if best is None or per_page > best[2]:
+                    best = ({param: per_page}, data, per_page)
+                honoured = per_page >= size
+                break
+            # Honoured as asked: the other param names have nothing to add
+            if honoured:
                 break
 
-        msg = f"Found {len(all_clients)} clients. Fetching details in parallel (100 threads)..."
-        if progress_callback: progress_callback(msg)
-        else: print(msg)
-        
-        detailed_data = []
-        total_clients = len(all_clients)
-        completed_count = 0
-        
-        # 2. Define helper for single client fetch
-        def fetch_single_client(client):
-            client_id = client.get('id')
-            if not client_id:
-                return None
-                
+        if best is None:
+            return None
+        self._applications_params = best[0]
+        if self.profile:
+            self.profile.set("applications_params", best[0])
+        if self.recorder:
+            self.recorder.note("applications_params", best[0])
+        return best[0], best[1]
+
+    async def _fetch_applications_page(self, run, params, page):
+        data = await self._get_applications_json(run, {**params, "page": page})
+        if data is None:
+            run.report(f"Skipping applications page {page}.")
+            return page, []
+        return page, data.get('data', [])
+
+    async def _get_applications_json(self, run, params):
+        url = f"{self.base_url}/api/v2/applications?{urlencode(params)}"
+        try:
+            response = await self._request(run, "GET", url)
+            if response.status_code == 200:
+                return response.json()
+            run.report(f"Error fetching applications ({params}): HTTP {response.status_code}")
+        except Exception as e:
+            run.report(f"Exception fetching applications ({params}): {e}")
+        return None
+
+    def _open_transport(self, concurrency):
+        if self.replay is not None:
+            return _ReplayTransport(self.replay)
+        if aiohttp is not None:
+            return _AiohttpTransport(self.headers, concurrency, self._aiohttp_stats)
+        self._resize_pool(concurrency)
+        return _ThreadTransport(self.session, concurrency)
+
+    @staticmethod
+    def _reporter(progress_callback):
+        def report(msg):
+            if progress_callback: progress_callback(msg)
+            else: print(msg)
+        return report
+
+    async def _request(self, run, method, url, json_body=None):
+        """
+        Sends one request under the run's adaptive limiter and, for a tenant of a
+        MultiTenantClient, the shared budget. Throttling responses (429/5xx) and transport
+        errors shrink the limit and are retried with jittered exponential backoff; the last
+        response is returned (or the last error raised) once retries run out.
+        """
+        for attempt in range(self.max_retries + 1):
+            token = await run.limiter.acquire()
+            if self.budget:
+                await self.budget.acquire(self.tenant)
+            response, error = None, None
+            started = time.perf_counter()
             try:
-                detail_url = f"{self.base_url}/api/v2/clients/{client_id}"
-                detail_res = requests.get(detail_url, headers=self.headers)
-                
-                if detail_res.status_code == 200:
-                    detail_json = detail_res.json()
-                    client_data = detail_json.get('data', {})
-                    
-                    visa_expiry_obj = client_data.get('visa_expiry_date')
-                    visa_expiry = visa_expiry_obj.get('actual') if visa_expiry_obj else None
-                    visa_type = client_data.get('visa_type')
-                    
-                    return {
-                        "Client Name": client_data.get('full_name'),
-                        "Visa Type": visa_type,
-                        "Visa Expiry Date": visa_expiry,
-                        "Email": client_data.get('email', {}).get('primary'),
-                        "Phone": client_data.get('phone', {}).get('formatted')
-                    }
+                response = await run.transport.request(method, url, json_body=json_body)
             except Exception as e:
-                print(f"Error fetching details for client {client_id}: {e}")
+                error = e
+            finally:
+                if self.budget:
+                    self.budget.release(self.tenant)
+            elapsed = time.perf_counter() - started
+            status = response.status_code if response is not None else None
+            run.metrics.observe(method, url, status, elapsed, len(response.content) if response is not None else 0)
+            if self.request_hook:
+                self.request_hook(method, url, status, elapsed)
+            if self.recorder and response is not None:
+                self.recorder.record(method, url, json_body, response)
+            throttled = error is not None or response.status_code in THROTTLE_STATUSES
+            await run.limiter.release(token, throttled=throttled)
+
+            if not throttled or attempt == self.max_retries:
+                break
+            run.retries += 1
+            run.metrics.retried(method, url)
+            retry_after = response.headers.get('Retry-After') if response is not None else None
+            await asyncio.sleep(backoff_delay(attempt, retry_after=retry_after))
+
+        if error is not None:
+            raise error
+        return response
+
+    async def _fetch_client_list(self, run, limit, data_callback, on_page):
+        """
+        Fetches the client list. Page 1 reveals meta.last_page, after which the remaining
+        pages are requested concurrently. `on_page` receives each page's clients as soon as
+        it lands; the returned list and the preview feed keep page order.
+        """
+        report = run.report
+        report("Fetching client list from Agentcis...")
+        run.metrics.phase_start("pagination")
+
+        checkpoint = run.checkpoint
+        restored = checkpoint.pages if checkpoint and checkpoint.resumed else {}
+
+        # 1. First page tells us how many pages there are
+        if 1 in restored:
+            first_batch, meta = restored[1], checkpoint.metas.get(1, {})
+        else:
+            _, first_batch, meta = await self._fetch_list_page(run, 1)
+        meta = meta or {}
+        last_page = meta.get('last_page', 1) if first_batch else 1
+        # The server may cap the page size below LIST_PAGE_SIZE, so a limit is counted in its pages
+        per_page = int(meta.get('per_page') or len(first_batch) or LIST_PAGE_SIZE)
+        if limit:
+            last_page = min(last_page, math.ceil(limit / per_page))
+
+        total = meta.get('total', len(first_batch))
+        if limit:
+            total = min(total, limit)
+        report(
+            f"Found {total} clients across {last_page} pages. "
+            f"Fetching remaining pages{' and client details' if run.plan.needs_detail else ''} concurrently..."
+        )
+
+        pages = {}
+        next_page = 1
+        all_clients = []
+
+        async def land(page, batch, page_meta):
+            nonlocal next_page
+            if limit:
+                batch = batch[:max(limit - (page - 1) * per_page, 0)]
+            await on_page(batch)
+            pages[page] = batch
+            # Failed pages (no meta) stay unfinished so a resume retries them
+            if checkpoint and page not in restored and page_meta is not None:
+                checkpoint.page_done(page, batch, meta=page_meta if page == 1 else None)
+
+            # Merge contiguous pages in order for the returned list and the UI preview
+            while next_page in pages:
+                ordered_batch = pages.pop(next_page)
+                all_clients.extend(ordered_batch)
+                if data_callback and ordered_batch:
+                    # Extract just a few fields for the preview table
+                    preview_data = []
+                    for c in ordered_batch:
+                        preview_data.append({
+                            "ID": c.get('id'),
+                            "Name": c.get('full_name'),
+                            "Email": c.get('email')
+                        })
+                    data_callback(preview_data)
+                next_page += 1
+
+        await land(1, first_batch, meta if first_batch or meta else None)
+
+        # 2. Remaining pages in parallel, handled in completion order; checkpointed pages need no request
+        for page in range(2, last_page + 1):
+            if page in restored:
+                await land(page, restored[page], None)
+        tasks = [
+            asyncio.create_task(self._fetch_list_page(run, page))
+            for page in range(2, last_page + 1)
+            if page not in restored
+        ]
+        pages_done = 1 + sum(1 for page in restored if 1 < page <= last_page)
+        for next_result in asyncio.as_completed(tasks):
+            page, batch, page_meta = await next_result
+            await land(page, batch, page_meta)
+            pages_done += 1
+            if pages_done % 10 == 0 or pages_done == last_page:
+                report(f"Fetched client list page {pages_done}/{last_page}...")
+
+        run.metrics.phase_end("pagination")
+        return all_clients
+
+    async def _fetch_list_page(self, run, page):
+        """Returns (page, clients, meta); a failed page is reported and yields no clients and meta None."""
+        clients_url = f"{self.base_url}/api/v2/clients/list"
+        try:
+            payload = {"page": page, "limit": LIST_PAGE_SIZE}
+            if run.plan and run.plan.expansion_param:
+                payload[run.plan.expansion_param] = run.plan.expansion_keys
+            response = await self._request(run, "POST", clients_url, json_body=payload)
+
+            if response.status_code == 200:
+                decode_started = time.perf_counter()
+                data = response.json()
+                run.metrics.add_processing("decode", time.perf_counter() - decode_started)
+                return page, data.get('data', []), data.get('meta', {})
+            run.report(f"Error fetching list page {page}: {response.text}")
+        except Exception as e:
+            run.report(f"Exception fetching list page {page}: {e}")
+        return page, [], None
+
+    async def _detail_worker(self, run, queue, results, progress):
+        """Pulls clients off the queue until it receives the None sentinel."""
+        while True:
+            client = await queue.get()
+            if client is None:
+                return
+
+            run.metrics.phase_start("detail")
+            result = await self._fetch_single_client(run, client)
+            run.metrics.phase_end("detail")
+            if result:
+                if self.store:
+                    self.store.put(client['id'], _updated_at(client), result)
+                if self.cache:
+                    self.cache.put(client['id'], _updated_at(client), result)
+                record = _select_row(result, run.plan.fields)
+                await results.put(record)
+                if run.checkpoint:
+                    run.checkpoint.record(client['id'], record)
+
+            progress["completed"] += 1
+            if progress["completed"] % 20 == 0:
+                run.report(f"Processed {progress['completed']}/{progress['listed']} clients...")
+
+    async def _fetch_single_client(self, run, client):
+        client_id = client.get('id')
+        if not client_id:
             return None
 
-        # 3. Execute in parallel
-        # Increased to 100 workers as requested
-        with concurrent.futures.ThreadPoolExecutor(max_workers=100) as executor:
-            future_to_client = {executor.submit(fetch_single_client, client): client for client in all_clients}
-            
-            for future in concurrent.futures.as_completed(future_to_client):
-                result = future.result()
-                if result:
-                    detailed_data.append(result)
-                
-                completed_count += 1
-                if completed_count % 20 == 0 or completed_count == total_clients:
-                    msg = f"Processed {completed_count}/{total_clients} clients..."
-                    if progress_callback: progress_callback(msg)
-                    else: print(msg)
-
-        return pd.DataFrame(detailed_data)
+        try:
+            detail_url = f"{self.base_url}/api/v2/clients/{client_id}"
+            detail_res = await self._request(run, "GET", detail_url)
+
+            if detail_res.status_code == 200:
+                decode_started = time.perf_counter()
+                client_data = self.detail_decoder(detail_res.content)
+
+                # Store and cache keep every catalog field so any report can reuse the record
+                record = _project(client_data, CLIENT_FIELDS)
+                run.metrics.add_processing("decode", time.perf_counter() - decode_started)
+                return record
+            run.failed.append(client_id)
+        except Exception as e:
+            print(f"Error fetching details for client {client_id}: {e}")
+            run.failed.append(client_id)
+        return None
 
 if __name__ == "__main__":
     # Test run
     import json
     with open("config.json", "r") as f:
         config = json.load(f)
-    
+
     client = AgentcisClient(config["agentcis_api_token"], config["agentcis_base_url"])
     df = client.fetch_visa_data(limit=10)
     print(df.head())
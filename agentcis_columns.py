@@ -0,0 +1,57 @@
+import sys
+from array import array
+
+import pandas as pd
+
+
+class ColumnBuffer:
+    """
+    Accumulates fixed-layout rows (tuples in `columns` order) column by column.
+
+    Plain columns are lists holding references to the decoded values, so a row costs
+    one pointer per column instead of a dict. Columns named in `categorical` (e.g. Visa
+    Type, a handful of distinct strings across thousands of clients) are stored as int32
+    codes into an interned category list and become pandas Categoricals without a
+    per-row pass. to_frame() hands the columns straight to pandas.
+    """
+
+    __slots__ = ("columns", "_values", "_codes", "_categories", "_lookup", "_size", "_plain", "_coded")
+
+    def __init__(self, columns, categorical=()):
+        self.columns = list(columns)
+        self._size = 0
+        self._values = {name: [] for name in self.columns if name not in categorical}
+        self._codes = {name: array("i") for name in self.columns if name in categorical}
+        self._categories = {name: [] for name in self._codes}
+        self._lookup = {name: {} for name in self._codes}
+        # (row index, bound append) pairs, resolved once instead of per value
+        self._plain = [(i, self._values[name].append) for i, name in enumerate(self.columns) if name in self._values]
+        self._coded = [(i, name) for i, name in enumerate(self.columns) if name in self._codes]
+
+    def __len__(self):
+        return self._size
+
+    def append(self, row):
+        for i, append in self._plain:
+            append(row[i])
+        for i, name in self._coded:
+            value = row[i]
+            if value is None:
+                self._codes[name].append(-1)
+                continue
+            lookup = self._lookup[name]
+            code = lookup.get(value)
+            if code is None:
+                code = lookup[value] = len(self._categories[name])
+                self._categories[name].append(sys.intern(value) if isinstance(value, str) else value)
+            self._codes[name].append(code)
+        self._size += 1
+
+    def to_frame(self):
+        data = {}
+        for name in self.columns:
+            if name in self._codes:
+                data[name] = pd.Categorical.from_codes(self._codes[name], categories=self._categories[name])
+            else:
+                data[name] = self._values[name]
+        return pd.DataFrame(data, columns=self.columns)
@@ -0,0 +1,56 @@
+import json
+from typing import Any
+
+try:
+    import msgspec
+except ImportError:  # Optional: typed partial decoding of detail payloads
+    msgspec = None
+
+try:
+    import orjson
+except ImportError:  # Optional: faster full decoding
+    orjson = None
+
+# Full decoder for any payload: orjson when installed, otherwise the stdlib parser
+loads = orjson.loads if orjson is not None else json.loads
+
+
+def available_backends():
+    return [name for name, module in (("msgspec", msgspec), ("orjson", orjson), ("json", json)) if module is not None]
+
+
+class DetailDecoder:
+    """
+    Decodes a client detail response ({"data": {...}}) into a dict of just `keys`.
+
+    With msgspec, a typed envelope is generated for those keys and every other key in the
+    (large, nested) payload is skipped without being materialised. Without it, orjson or the
+    stdlib parser decode the whole document and the keys are picked afterwards. A payload the
+    typed decoder rejects (unexpected shape) is retried with the full parser, so the result
+    never depends on which backend is installed.
+    """
+
+    def __init__(self, keys, backend=None):
+        self.keys = tuple(dict.fromkeys(keys))
+        # An unknown or uninstalled backend falls back to the best one available
+        self.backend = backend if backend in available_backends() else available_backends()[0]
+        self.fallbacks = 0
+        self._typed = None
+        if self.backend == "msgspec":
+            # Values stay untyped (Any): list rows and detail payloads disagree on str vs object
+            detail = msgspec.defstruct("ClientDetail", [(key, Any, None) for key in self.keys])
+            envelope = msgspec.defstruct("ClientDetailEnvelope", [("data", detail, None)])
+            self._typed = msgspec.json.Decoder(envelope)
+        self._loads = orjson.loads if self.backend == "orjson" else json.loads
+
+    def __call__(self, content):
+        if self._typed is not None:
+            try:
+                data = self._typed.decode(content).data
+                if data is None:
+                    return {}
+                return {key: getattr(data, key) for key in self.keys}
+            except (msgspec.DecodeError, msgspec.ValidationError):
+                self.fallbacks += 1
+        data = self._loads(content).get('data') or {}
+        return {key: data.get(key) for key in self.keys}
@@ -0,0 +1,63 @@
+import asyncio
+import random
+import time
+
+THROTTLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+class AdaptiveLimiter:
+    """
+    AIMD cap on in-flight requests, in the style of TCP congestion control.
+
+    Every successful call grows the limit by 1/limit (about +1 per window of calls);
+    a throttle signal (429, 5xx, timeout) halves it. Only one cut is taken per window:
+    calls that started before the last cut cannot cut again, so a burst of failures from
+    the same overloaded moment does not collapse the limit to the floor.
+    """
+
+    def __init__(self, max_limit, min_limit=1, initial=None):
+        self.max_limit = max(int(max_limit), 1)
+        self.min_limit = max(min(int(min_limit), self.max_limit), 1)
+        self.limit = float(initial if initial is not None else self.max_limit)
+        self.in_flight = 0
+        self.lowest = self.limit
+        self._last_cut = 0.0
+        self._condition = None
+
+    def _cond(self):
+        # Created lazily so the limiter can be built outside the event loop that uses it
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    async def acquire(self):
+        """Waits for a free slot and returns a token to hand back to release()."""
+        cond = self._cond()
+        async with cond:
+            await cond.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+        return time.monotonic()
+
+    async def release(self, token, throttled=False):
+        cond = self._cond()
+        async with cond:
+            self.in_flight -= 1
+            if throttled:
+                if token > self._last_cut:
+                    self.limit = max(self.min_limit, self.limit / 2)
+                    self.lowest = min(self.lowest, self.limit)
+                    self._last_cut = time.monotonic()
+            else:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            cond.notify_all()
+
+
+def backoff_delay(attempt, base=0.5, cap=30.0, retry_after=None):
+    """Full-jitter exponential backoff; a server Retry-After (seconds) sets the floor."""
+    delay = random.uniform(0, min(cap, base * 2 ** attempt))
+    if retry_after:
+        try:
+            delay = max(delay, min(float(retry_after), cap))
+        except ValueError:
+            pass
+    return delay
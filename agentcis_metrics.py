@@ -0,0 +1,180 @@
+import bisect
+import os
+import re
+import time
+from urllib.parse import urlsplit
+
+# Upper bounds (seconds) of the latency histogram buckets; the last bucket is +Inf
+LATENCY_BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+
+def endpoint_name(method, url):
+    """'GET https://x/api/v2/clients/613?a=1' -> 'GET /api/v2/clients/{id}'."""
+    return f"{method.upper()} {_ID_SEGMENT.sub('/{id}', urlsplit(url).path)}"
+
+
+class EndpointMetrics:
+    __slots__ = ("bucket_counts", "count", "latency_sum", "statuses", "bytes_received", "retries")
+
+    def __init__(self):
+        self.bucket_counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.latency_sum = 0.0
+        self.statuses = {}
+        self.bytes_received = 0
+        self.retries = 0
+
+    def quantile(self, q):
+        """Approximate quantile from the histogram (upper bound of the bucket it falls in)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.bucket_counts):
+            seen += bucket_count
+            if seen >= rank:
+                return LATENCY_BUCKETS[i] if i < len(LATENCY_BUCKETS) else float("inf")
+        return float("inf")
+
+    def to_dict(self):
+        return {
+            "requests": self.count,
+            "latency_seconds_sum": self.latency_sum,
+            "latency_buckets": dict(zip([*map(str, LATENCY_BUCKETS), "+Inf"], self.bucket_counts)),
+            "p50_seconds": self.quantile(0.5),
+            "p95_seconds": self.quantile(0.95),
+            "statuses": dict(self.statuses),
+            "bytes_received": self.bytes_received,
+            "retries": self.retries,
+        }
+
+
+class FetchMetrics:
+    """
+    Telemetry for one Agentcis fetch: per-endpoint latency histograms, status-code counts,
+    bytes received and retries, plus wall-clock time per phase (pagination, detail fan-out).
+    Phases overlap since detail calls start while list pages are still arriving.
+    """
+
+    def __init__(self):
+        self.endpoints = {}
+        self.phases = {}
+        # Cumulative seconds our own code spends per step (e.g. decoding), summed across tasks
+        self.processing = {}
+        self.started_at = time.time()
+        self._origin = time.perf_counter()
+
+    def observe(self, method, url, status, elapsed, bytes_received=0):
+        metrics = self.endpoints.get(endpoint := endpoint_name(method, url))
+        if metrics is None:
+            metrics = self.endpoints[endpoint] = EndpointMetrics()
+        metrics.bucket_counts[bisect.bisect_left(LATENCY_BUCKETS, elapsed)] += 1
+        metrics.count += 1
+        metrics.latency_sum += elapsed
+        key = str(status) if status is not None else "error"
+        metrics.statuses[key] = metrics.statuses.get(key, 0) + 1
+        metrics.bytes_received += bytes_received
+
+    def retried(self, method, url):
+        metrics = self.endpoints.get(endpoint := endpoint_name(method, url))
+        if metrics is None:
+            metrics = self.endpoints[endpoint] = EndpointMetrics()
+        metrics.retries += 1
+
+    def phase_start(self, phase):
+        """Marks the first time a phase began; later calls are ignored."""
+        now = time.perf_counter() - self._origin
+        self.phases.setdefault(phase, [now, now])
+
+    def phase_end(self, phase):
+        """Marks the latest time a phase was still active."""
+        now = time.perf_counter() - self._origin
+        self.phases.setdefault(phase, [now, now])[1] = now
+
+    def add_processing(self, step, seconds):
+        self.processing[step] = self.processing.get(step, 0.0) + seconds
+
+    def phase_seconds(self):
+        return {phase: end - start for phase, (start, end) in self.phases.items()}
+
+    def to_dict(self):
+        return {
+            "started_at": self.started_at,
+            "phases_seconds": self.phase_seconds(),
+            "processing_seconds": dict(self.processing),
+            "endpoints": {name: m.to_dict() for name, m in self.endpoints.items()},
+        }
+
+    def summary(self):
+        """One line per endpoint plus phase timings, for the progress log."""
+        lines = []
+        for name, m in self.endpoints.items():
+            statuses = ", ".join(f"{k}: {v}" for k, v in sorted(m.statuses.items()))
+            lines.append(
+                f"{name}: {m.count} requests, p50 <= {m.quantile(0.5) * 1000:.0f} ms, "
+                f"p95 <= {m.quantile(0.95) * 1000:.0f} ms, {m.bytes_received / 1_048_576:.1f} MB, "
+                f"{m.retries} retries ({statuses})"
+            )
+        phases = ", ".join(f"{phase} {seconds:.1f}s" for phase, seconds in self.phase_seconds().items())
+        if phases:
+            lines.append(f"Phases: {phases}")
+        if self.processing:
+            lines.append("Processing: " + ", ".join(f"{step} {seconds:.2f}s" for step, seconds in self.processing.items()))
+        return lines
+
+    def to_prometheus(self):
+        """Renders the metrics in the Prometheus text exposition format."""
+        out = [
+            "# HELP agentcis_request_duration_seconds Agentcis API request latency.",
+            "# TYPE agentcis_request_duration_seconds histogram",
+        ]
+        for name, m in self.endpoints.items():
+            method, path = name.split(" ", 1)
+            labels = f'method="{method}",endpoint="{path}"'
+            cumulative = 0
+            for bound, bucket_count in zip([*map(str, LATENCY_BUCKETS), "+Inf"], m.bucket_counts):
+                cumulative += bucket_count
+                out.append(f'agentcis_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            out.append(f"agentcis_request_duration_seconds_sum{{{labels}}} {m.latency_sum:.6f}")
+            out.append(f"agentcis_request_duration_seconds_count{{{labels}}} {m.count}")
+
+        out += ["# HELP agentcis_responses_total Responses by status code ('error' = no response).",
+                "# TYPE agentcis_responses_total counter"]
+        for name, m in self.endpoints.items():
+            method, path = name.split(" ", 1)
+            for status, count in sorted(m.statuses.items()):
+                out.append(f'agentcis_responses_total{{method="{method}",endpoint="{path}",status="{status}"}} {count}')
+
+        out += ["# HELP agentcis_response_bytes_total Response body bytes received.",
+                "# TYPE agentcis_response_bytes_total counter"]
+        for name, m in self.endpoints.items():
+            method, path = name.split(" ", 1)
+            out.append(f'agentcis_response_bytes_total{{method="{method}",endpoint="{path}"}} {m.bytes_received}')
+
+        out += ["# HELP agentcis_retries_total Requests retried after throttling or errors.",
+                "# TYPE agentcis_retries_total counter"]
+        for name, m in self.endpoints.items():
+            method, path = name.split(" ", 1)
+            out.append(f'agentcis_retries_total{{method="{method}",endpoint="{path}"}} {m.retries}')
+
+        out += ["# HELP agentcis_phase_seconds Wall-clock seconds spent in each fetch phase.",
+                "# TYPE agentcis_phase_seconds gauge"]
+        for phase, seconds in self.phase_seconds().items():
+            out.append(f'agentcis_phase_seconds{{phase="{phase}"}} {seconds:.6f}')
+
+        out += ["# HELP agentcis_processing_seconds_total Seconds spent in local processing steps.",
+                "# TYPE agentcis_processing_seconds_total counter"]
+        for step, seconds in self.processing.items():
+            out.append(f'agentcis_processing_seconds_total{{step="{step}"}} {seconds:.6f}')
+
+        out.append(f"agentcis_fetch_started_timestamp_seconds {self.started_at:.3f}")
+        return "\n".join(out) + "\n"
+
+    def write_prometheus(self, path):
+        """Writes the text file atomically (e.g. for node_exporter's textfile collector)."""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp_path, path)
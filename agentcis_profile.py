@@ -0,0 +1,45 @@
+import json
+import os
+import threading
+
+DEFAULT_PROFILE_PATH = "agentcis_profile.json"
+# Tenants of one process share the file, so read-modify-write is serialised process-wide
+_write_lock = threading.Lock()
+
+
+class ServerProfile:
+    """
+    What has been learned about an Agentcis server (e.g. the page-size params
+    /api/v2/applications honours), kept in a small JSON file so later runs skip the probes.
+
+    The file maps namespace (the base URL) -> {name: value}. Writes replace the whole file
+    atomically; a file that cannot be read is treated as empty, so the worst case is
+    probing again.
+    """
+
+    def __init__(self, path=DEFAULT_PROFILE_PATH, namespace=""):
+        self.path = path
+        self.namespace = namespace
+
+    def _read(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                profiles = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return profiles if isinstance(profiles, dict) else {}
+
+    def get(self, name, default=None):
+        return self._read().get(self.namespace, {}).get(name, default)
+
+    def set(self, name, value):
+        with _write_lock:
+            profiles = self._read()
+            profile = profiles.setdefault(self.namespace, {})
+            if name in profile and profile[name] == value:
+                return
+            profile[name] = value
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(profiles, f, indent=4)
+            os.replace(tmp_path, self.path)
@@ -0,0 +1,173 @@
+import gzip
+import io
+import json
+import threading
+import time
+import zlib
+from collections import defaultdict, deque
+from urllib.parse import urlsplit
+
+try:
+    import zstandard
+except ImportError:  # Optional: .zst archives need the zstandard package
+    zstandard = None
+
+# Response headers worth keeping for replay (backoff honours Retry-After)
+RECORDED_HEADERS = ("Content-Type", "Retry-After")
+
+
+def open_archive(path, mode):
+    """Opens a JSONL archive as text; compression follows the extension (.zst, .gz or none)."""
+    if path.endswith(".zst"):
+        if zstandard is None:
+            raise RuntimeError("Reading or writing .zst archives requires the 'zstandard' package.")
+        return zstandard.open(path, mode + "t", encoding="utf-8")
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def request_key(method, url, body):
+    """Host-independent key, so an archive recorded against one tenant URL replays anywhere."""
+    parts = urlsplit(url)
+    target = parts.path + (f"?{parts.query}" if parts.query else "")
+    return method.upper(), target, json.dumps(body, sort_keys=True) if body is not None else None
+
+
+class TrafficRecorder:
+    """
+    Appends every request/response pair to a compressed JSONL archive.
+    Each run's file handle is closed at the end of the run (close()); the next record
+    reopens it in append mode, which gzip and zstd both support as concatenated streams.
+
+    Probe answers the run used (see note()) are archived as {"type": "profile"} lines, so
+    a replay takes the same path even when the recorded run answered its probes from the
+    server profile rather than with requests.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self._lock = threading.Lock()
+        self._file = None
+
+    def record(self, method, url, body, response):
+        entry = {
+            "method": method.upper(),
+            "url": url,
+            "body": body,
+            "status": response.status_code,
+            "headers": {k: response.headers[k] for k in RECORDED_HEADERS if response.headers.get(k) is not None},
+            "content": response.content.decode("utf-8", errors="replace"),
+            "recorded_at": time.time(),
+        }
+        self._append(entry)
+        with self._lock:
+            self.count += 1
+
+    def note(self, name, value):
+        """Archives a probe answer (a server profile entry) the recorded run relied on."""
+        self._append({"type": "profile", "name": name, "value": value, "recorded_at": time.time()})
+
+    def _append(self, entry):
+        line = json.dumps(entry) + "\n"
+        with self._lock:
+            if self._file is None:
+                self._file = open_archive(self.path, "a")
+            self._file.write(line)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class ReplayArchive:
+    """
+    Serves recorded responses by request key. Repeated identical requests (retries, re-runs)
+    get the recorded responses in order; once exhausted, the last one keeps being served.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.served = 0
+        self.missing = 0
+        # Probe answers of the recorded runs; dict values (answers per key set) are merged
+        self.profile = {}
+        self._responses = defaultdict(deque)
+        self._lock = threading.Lock()
+        for entry in self._read_entries(path):
+            if entry.get("type") == "profile":
+                value = entry["value"]
+                if isinstance(value, dict) and isinstance(self.profile.get(entry["name"]), dict):
+                    value = {**self.profile[entry["name"]], **value}
+                self.profile[entry["name"]] = value
+                continue
+            key = request_key(entry["method"], entry["url"], entry.get("body"))
+            self._responses[key].append((entry["status"], entry["content"].encode("utf-8"), entry.get("headers", {})))
+
+    @staticmethod
+    def _read_entries(path):
+        with open_archive(path, "r") as f:
+            try:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        # Torn last line from a run that died mid-write
+                        break
+            except (EOFError, zlib.error, io.UnsupportedOperation, OSError):
+                # Truncated compressed stream: keep everything read so far
+                return
+
+    def __len__(self):
+        return sum(len(q) for q in self._responses.values())
+
+    def lookup(self, method, url, body):
+        """Returns (status, content bytes, headers) or None if the request was never recorded."""
+        key = request_key(method, url, body)
+        with self._lock:
+            queue = self._responses.get(key)
+            if not queue:
+                self.missing += 1
+                return None
+            self.served += 1
+            return queue.popleft() if len(queue) > 1 else queue[0]
+
+
+class RecordedProfile:
+    """Read-only ServerProfile stand-in for a replay: the probe answers archived by the recorded run."""
+
+    def __init__(self, archive):
+        self.archive = archive
+
+    def get(self, name, default=None):
+        return self.archive.profile.get(name, default)
+
+    def set(self, name, value):
+        pass
+
+
+if __name__ == "__main__":
+    # Record a live run, or replay one offline: python agentcis_replay.py record|replay ARCHIVE
+    import sys
+    from agentcis_client import AgentcisClient
+
+    if len(sys.argv) != 3 or sys.argv[1] not in ("record", "replay"):
+        sys.exit("usage: python agentcis_replay.py record|replay ARCHIVE(.jsonl[.gz|.zst])")
+    mode, archive = sys.argv[1], sys.argv[2]
+
+    with open("config.json", "r") as f:
+        config = json.load(f)
+    config[f"agentcis_{mode}_path"] = archive
+    config["agentcis_cache_path"] = None
+
+    client = AgentcisClient.from_config(config)
+    started = time.perf_counter()
+    df = client.fetch_visa_data()
+    print(f"{mode}: {len(df)} records in {time.perf_counter() - started:.2f}s")
+    client.close()
@@ -0,0 +1,90 @@
+import json
+import sqlite3
+import threading
+import time
+
+DEFAULT_STORE_PATH = "agentcis_store.sqlite"
+
+
+class ClientStore:
+    """
+    Local mirror of projected client detail records, keyed by tenant, client id and the
+    `updated_at.actual` stamp from /api/v2/clients/list. A stored record is reused for as
+    long as the list reports the same stamp, so incremental syncs only fetch details for
+    clients that are new or have changed since the last run.
+    """
+
+    def __init__(self, path=DEFAULT_STORE_PATH, namespace="", flush_every=200):
+        self.path = path
+        self.namespace = namespace
+        self.flush_every = flush_every
+        self._lock = threading.Lock()
+        self._pending = []
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS clients (
+                namespace TEXT NOT NULL,
+                id INTEGER NOT NULL,
+                updated_at TEXT,
+                record TEXT NOT NULL,
+                synced_at REAL NOT NULL,
+                PRIMARY KEY (namespace, id)
+            )
+            """
+        )
+        self._conn.commit()
+
+    def lookup(self, client_ids):
+        """Returns {id: (updated_at, record)} for the ids already in the store."""
+        client_ids = [int(i) for i in client_ids if i]
+        if not client_ids:
+            return {}
+        placeholders = ",".join("?" * len(client_ids))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, updated_at, record FROM clients WHERE namespace = ? AND id IN ({placeholders})",
+                [self.namespace, *client_ids],
+            ).fetchall()
+        return {row[0]: (row[1], json.loads(row[2])) for row in rows}
+
+    def put(self, client_id, updated_at, record):
+        """Queues a record for writing; pending rows are committed in batches."""
+        with self._lock:
+            self._pending.append((self.namespace, int(client_id), updated_at, json.dumps(record), time.time()))
+            if len(self._pending) >= self.flush_every:
+                self._flush_locked()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._pending:
+            return
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO clients (namespace, id, updated_at, record, synced_at) VALUES (?, ?, ?, ?, ?)",
+            self._pending,
+        )
+        self._conn.commit()
+        self._pending = []
+
+    def records(self):
+        """Yields every stored record for this namespace."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT record FROM clients WHERE namespace = ? ORDER BY id", [self.namespace]
+            ).fetchall()
+        for (record,) in rows:
+            yield json.loads(record)
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM clients WHERE namespace = ?", [self.namespace]
+            ).fetchone()[0]
+
+    def close(self):
+        self.flush()
+        self._conn.close()
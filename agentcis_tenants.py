@@ -0,0 +1,262 @@
+import asyncio
+import os
+import re
+from collections import defaultdict, deque
+from urllib.parse import urlsplit
+
+import pandas as pd
+
+from agentcis_client import (
+    AgentcisClient, DEFAULT_CONCURRENCY, STREAM_BUFFER, VISA_COLUMNS, _iter_in_thread, _run_sync,
+)
+from agentcis_checkpoint import DEFAULT_CHECKPOINT_PATH
+from agentcis_columns import ColumnBuffer
+
+TENANT_COLUMN = "Tenant"
+TENANT_VISA_COLUMNS = VISA_COLUMNS + [TENANT_COLUMN]
+# Per-run files that would collide if tenants shared them; the store and cache are namespaced by base URL
+PER_TENANT_PATH_KEYS = ("agentcis_checkpoint_path", "agentcis_metrics_path", "agentcis_record_path", "agentcis_replay_path")
+
+_END_OF_TENANT = object()
+
+
+def _tenant_path(path, name):
+    """'agentcis_checkpoint.jsonl' -> 'agentcis_checkpoint.sydney.jsonl'."""
+    directory, filename = os.path.split(path)
+    stem, dot, extension = filename.partition(".")
+    slug = re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-") or "tenant"
+    return os.path.join(directory, f"{stem}.{slug}{dot}{extension}")
+
+
+def tenant_configs(config):
+    """
+    Expands config.json into (name, config) pairs, one per tenant.
+
+    Each entry of agentcis_tenants overrides the top-level agentcis_* keys (at least
+    agentcis_api_token and agentcis_base_url; "name" labels the Tenant column and defaults
+    to the host). Per-run file paths inherited from the top level get the tenant name
+    inserted so tenants never write the same checkpoint, metrics or archive file.
+    Without agentcis_tenants the top-level keys form the only tenant.
+    """
+    tenants = config.get("agentcis_tenants")
+    if not tenants:
+        name = config.get("agentcis_tenant_name") or urlsplit(config["agentcis_base_url"]).hostname
+        return [(name, config)]
+
+    shared = {key: value for key, value in config.items() if key != "agentcis_tenants"}
+    shared.setdefault("agentcis_checkpoint_path", DEFAULT_CHECKPOINT_PATH)
+    expanded = []
+    for tenant in tenants:
+        name = tenant.get("name") or urlsplit(tenant["agentcis_base_url"]).hostname
+        merged = {**shared, **tenant}
+        for key in PER_TENANT_PATH_KEYS:
+            if key not in tenant and merged.get(key):
+                merged[key] = _tenant_path(merged[key], name)
+        expanded.append((name, merged))
+    return expanded
+
+
+class FairShareBudget:
+    """
+    Global cap on in-flight requests, shared fairly between tenants.
+
+    A free slot goes to the waiting tenant with the fewest requests in flight, so every
+    busy tenant converges on total / busy tenants while an idle tenant's share is lent to
+    the others (the budget never sits unused while anyone is waiting).
+    """
+
+    def __init__(self, total):
+        self.total = max(int(total), 1)
+        self.in_flight = 0
+        self.by_tenant = defaultdict(int)
+        self._waiters = {}
+
+    async def acquire(self, tenant):
+        if self.in_flight < self.total and not any(self._waiters.values()):
+            self._take(tenant)
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(tenant, deque()).append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Granted just as we were cancelled: hand the slot on
+                self.release(tenant)
+            raise
+
+    def release(self, tenant):
+        self.in_flight -= 1
+        self.by_tenant[tenant] -= 1
+        self._grant()
+
+    def _take(self, tenant):
+        self.in_flight += 1
+        self.by_tenant[tenant] += 1
+
+    def _grant(self):
+        while self.in_flight < self.total:
+            waiting = [tenant for tenant, queue in self._waiters.items() if queue]
+            if not waiting:
+                return
+            tenant = min(waiting, key=lambda t: self.by_tenant[t])
+            waiter = self._waiters[tenant].popleft()
+            if waiter.done():
+                continue  # cancelled while queued
+            self._take(tenant)
+            waiter.set_result(None)
+
+
+class MultiTenantClient:
+    """
+    Fetches several Agentcis tenants concurrently under one FairShareBudget of
+    `concurrency` in-flight requests, merging their records with a Tenant column.
+    A run takes about as long as the slowest tenant rather than the sum of all of them.
+    Each tenant keeps its own AgentcisClient (adaptive limit, store, cache, checkpoint);
+    a tenant that fails is reported and the others still complete.
+    """
+
+    def __init__(self, clients, concurrency=DEFAULT_CONCURRENCY):
+        self.clients = dict(clients)
+        self.concurrency = concurrency
+        self.budget = FairShareBudget(concurrency)
+        for name, client in self.clients.items():
+            client.budget = self.budget
+            client.tenant = name
+
+    @classmethod
+    def from_config(cls, config):
+        """Builds one AgentcisClient per entry of tenant_configs(config)."""
+        return cls(
+            [(name, AgentcisClient.from_config(tenant_config)) for name, tenant_config in tenant_configs(config)],
+            concurrency=config.get("agentcis_concurrency", DEFAULT_CONCURRENCY),
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        for client in self.clients.values():
+            client.close()
+
+    def fetch_visa_data(self, limit=None, progress_callback=None, data_callback=None, resume=False):
+        """Synchronous wrapper around fetch_visa_data_async."""
+        return _run_sync(self.fetch_visa_data_async(
+            limit=limit, progress_callback=progress_callback, data_callback=data_callback, resume=resume,
+        ))
+
+    async def fetch_visa_data_async(self, limit=None, progress_callback=None, data_callback=None, resume=False):
+        """Returns one DataFrame with TENANT_VISA_COLUMNS for all tenants."""
+        return await self.fetch_client_data_async(
+            VISA_COLUMNS, limit=limit, progress_callback=progress_callback, data_callback=data_callback, resume=resume,
+        )
+
+    def fetch_client_data(self, fields, limit=None, progress_callback=None, data_callback=None, resume=False):
+        """Synchronous wrapper around fetch_client_data_async."""
+        return _run_sync(self.fetch_client_data_async(
+            fields, limit=limit, progress_callback=progress_callback, data_callback=data_callback, resume=resume,
+        ))
+
+    async def fetch_client_data_async(self, fields, limit=None, progress_callback=None, data_callback=None,
+                                      resume=False):
+        """
+        Returns one DataFrame of `fields` plus the Tenant column for all tenants. Per-tenant
+        telemetry is attached as df.attrs["fetch_metrics"] = {tenant: FetchMetrics.to_dict()}.
+        """
+        buffer = ColumnBuffer(list(fields) + [TENANT_COLUMN], categorical=("Visa Type", TENANT_COLUMN))
+        async for row in self._aiter_rows(fields, limit, progress_callback, data_callback, resume):
+            buffer.append(row)
+        df = buffer.to_frame()
+        df.attrs["fetch_metrics"] = {
+            name: client.last_metrics.to_dict() for name, client in self.clients.items() if client.last_metrics
+        }
+        return df
+
+    def fetch_applications(self, progress_callback=None, columns=None):
+        """Synchronous wrapper around fetch_applications_async."""
+        return _run_sync(self.fetch_applications_async(progress_callback=progress_callback, columns=columns))
+
+    async def fetch_applications_async(self, progress_callback=None, columns=None):
+        """All tenants' applications, synced concurrently under the shared budget, with a Tenant column."""
+        report = AgentcisClient._reporter(progress_callback)
+
+        async def fetch(name, client):
+            df = await client.fetch_applications_async(
+                progress_callback=lambda msg: report(f"[{name}] {msg}"), columns=columns,
+            )
+            df[TENANT_COLUMN] = name
+            return df
+
+        results = await asyncio.gather(
+            *(fetch(name, client) for name, client in self.clients.items()), return_exceptions=True,
+        )
+        frames = []
+        for name, result in zip(self.clients, results):
+            if isinstance(result, Exception):
+                report(f"[{name}] Applications sync failed: {result}")
+            else:
+                frames.append(result)
+        if not frames:
+            raise RuntimeError("Applications sync failed for every tenant")
+        df = pd.concat(frames, ignore_index=True)
+        df.attrs["fetch_metrics"] = {
+            name: client.last_metrics.to_dict() for name, client in self.clients.items() if client.last_metrics
+        }
+        return df
+
+    async def aiter_visa_records(self, limit=None, progress_callback=None, data_callback=None, resume=False):
+        """Yields visa records (tuples in TENANT_VISA_COLUMNS order) from all tenants as they complete."""
+        async for row in self._aiter_rows(VISA_COLUMNS, limit, progress_callback, data_callback, resume):
+            yield row
+
+    def iter_visa_records(self, limit=None, progress_callback=None, data_callback=None, resume=False):
+        """Synchronous generator over aiter_visa_records; callbacks run on the caller's thread."""
+        return _iter_in_thread(
+            lambda progress, data: self.aiter_visa_records(
+                limit=limit, progress_callback=progress, data_callback=data, resume=resume,
+            ),
+            progress_callback,
+            data_callback,
+        )
+
+    async def _aiter_rows(self, fields, limit, progress_callback, data_callback, resume):
+        report = AgentcisClient._reporter(progress_callback)
+        results = asyncio.Queue(maxsize=STREAM_BUFFER)
+        report(f"Fetching {len(self.clients)} tenants concurrently (shared limit {self.concurrency})...")
+
+        async def drain(name, client):
+            def tenant_report(msg):
+                report(f"[{name}] {msg}")
+
+            def tenant_preview(rows):
+                data_callback([{**row, TENANT_COLUMN: name} for row in rows])
+
+            try:
+                async for row in client._aiter_rows(
+                    fields,
+                    limit=limit,
+                    progress_callback=tenant_report,
+                    data_callback=tenant_preview if data_callback else None,
+                    resume=resume,
+                ):
+                    await results.put(row + (name,))
+            except Exception as e:
+                tenant_report(f"Fetch failed: {e}")
+            await results.put(_END_OF_TENANT)
+
+        tasks = [asyncio.create_task(drain(name, client)) for name, client in self.clients.items()]
+        try:
+            remaining = len(tasks)
+            while remaining:
+                row = await results.get()
+                if row is _END_OF_TENANT:
+                    remaining -= 1
+                    continue
+                yield row
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
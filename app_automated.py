@@ -1,14 +1,21 @@
 import pandas as pd
 from datetime import datetime, timedelta
-import io
 import json
-import smtplib
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from email.mime.base import MIMEBase
-from email import encoders
-from agentcis_client import AgentcisClient
+from collections import namedtuple
+from agentcis_client import AgentcisClient, VISA_COLUMNS
+from agentcis_columns import ColumnBuffer
+from agentcis_tenants import MultiTenantClient, TENANT_COLUMN, TENANT_VISA_COLUMNS, tenant_configs
+from singleflight import Flight, SingleFlight, DEFAULT_RESULT_TTL_SECONDS
+from prefetch_service import load_dataset
+from mail_outbox import Outbox
+import report_workbook
+import expiry_index
+from report_workbook import workbook_bytes
+from expiry_index import ExpiryIndex, DEFAULT_HORIZONS
+from artifact_cache import ArtifactCache, artifact_key, code_version, frame_fingerprint
 import os
+import sys
+import time
 
 # Configuration
 CONFIG_FILE = "config.json"
@@ -19,41 +26,289 @@ def load_config():
             return json.load(f)
     return {}
 
+def parse_expiry_date(value):
+    """Parses an Agentcis date string to a naive datetime (wall-clock date kept), or None."""
+    expiry = pd.to_datetime(value, errors='coerce')
+    if pd.isna(expiry):
+        return None
+    if expiry.tzinfo is not None:
+        expiry = expiry.tz_localize(None)
+    return expiry.to_pydatetime()
+
+# Identical fetches from concurrent dashboard sessions share one execution (see _start_shared_fetch);
+# the live table batches ("data" events) are dropped once delivered rather than kept for the TTL
+SHARED_FETCHES = SingleFlight(transient=("data",))
+# Which prefetched snapshot (prefetch_service.DATASETS) can serve each dataset
+SNAPSHOTS = {"clients": "visa", "applications": "applications"}
+
+def _stream_expiry_window(client, columns, days, limit=None, progress_callback=None, data_callback=None,
+                          resume=False):
+    """
+    Buckets visa records (tuples in `columns` order) as they stream in, keeping only clients
+    whose expiry falls between today and `days` days out in a ColumnBuffer, so neither the
+    full client list nor a dict per row is ever held. The frame's attrs["total_records"]
+    counts every client seen.
+    """
+    start = datetime.combine(datetime.now().date(), datetime.min.time())
+    end = start + timedelta(days=days + 1)
+    expiry_at = columns.index('Visa Expiry Date')
+    buffer = ColumnBuffer(columns, categorical=("Visa Type", TENANT_COLUMN))
+    total = 0
+    for row in client.iter_visa_records(limit=limit, progress_callback=progress_callback,
+                                        data_callback=data_callback, resume=resume):
+        total += 1
+        expiry = parse_expiry_date(row[expiry_at])
+        if expiry is not None and start <= expiry <= end:
+            buffer.append(row)
+    df = buffer.to_frame()
+    df.attrs["total_records"] = total
+    return df
+
+def _start_shared_fetch(config, dataset, fields, limit=None, resume=True, log=print, window_days=None):
+    """
+    Starts (or joins) the fetch of `fields` from one dataset ("clients" or "applications")
+    and returns its Flight, which ends with a ("frame", DataFrame) event.
+
+    A fresh prefetched snapshot holding every requested field is served without a request.
+    Otherwise the fetch is coalesced process-wide: one of the same tenants, dataset, fields
+    and limit already running is joined rather than repeated, and a finished one is replayed
+    for agentcis_result_ttl_seconds (default 60). With window_days the visa clients are
+    streamed and only the expiry window is kept (see _stream_expiry_window).
+    """
+    if limit is None:
+        prefetched = load_dataset(config, SNAPSHOTS[dataset])
+        if prefetched is not None:
+            snapshot, refreshed_at = prefetched
+            wanted = list(fields) + ([TENANT_COLUMN] if TENANT_COLUMN in snapshot.columns else [])
+            if set(wanted) <= set(snapshot.columns):
+                log(f"Using prefetched {dataset} from {refreshed_at:%d %b %Y %H:%M} ({len(snapshot)} rows).")
+                flight = Flight((dataset, "snapshot"))
+                flight.publish("frame", snapshot[wanted])
+                flight.finish()
+                return flight
+
+    key = (dataset, tuple((name, c["agentcis_base_url"]) for name, c in tenant_configs(config)), tuple(fields), limit)
+    if window_days is not None:
+        key += ("expiry window", str(datetime.now().date()), window_days)
+
+    def fetch(publish):
+        client_cls = MultiTenantClient if config.get("agentcis_tenants") else AgentcisClient
+        progress = lambda message: publish("progress", message)
+        with client_cls.from_config(config) as client:
+            if window_days is not None:
+                columns = TENANT_VISA_COLUMNS if config.get("agentcis_tenants") else VISA_COLUMNS
+                df = _stream_expiry_window(client, columns, window_days, limit=limit, progress_callback=progress,
+                                           data_callback=lambda batch: publish("data", batch), resume=resume)
+            elif dataset == "clients":
+                df = client.fetch_client_data(list(fields), limit=limit, progress_callback=progress,
+                                              data_callback=lambda batch: publish("data", batch), resume=resume)
+            else:
+                df = client.fetch_applications(progress_callback=progress, columns=list(fields))
+        publish("frame", df)
+
+    flight = SHARED_FETCHES.join(key, fetch, ttl=config.get("agentcis_result_ttl_seconds", DEFAULT_RESULT_TTL_SECONDS))
+    if flight.done:
+        log(f"Reusing a {dataset} fetch that finished {time.time() - flight.finished_at:.0f}s ago.")
+    elif flight.subscribers:
+        log(f"Joining a {dataset} fetch already in progress (started {time.time() - flight.started_at:.0f}s ago).")
+    else:
+        log(f"Fetching {dataset} (this may take a while)...")
+    return flight
+
+def _collect_frame(flight, progress_callback=None, data_callback=None):
+    """Follows a shared fetch on the caller's thread and returns its DataFrame."""
+    frame = None
+    for kind, payload in flight.subscribe():
+        if kind == "frame":
+            frame = payload
+        elif kind == "progress" and progress_callback:
+            progress_callback(payload)
+        elif kind == "data" and data_callback:
+            data_callback(payload)
+    return frame
+
+def fetch_dataset(config, dataset, fields, progress_callback=None, data_callback=None):
+    """
+    One dataset's `fields` as a DataFrame, the way the pipeline fetches it: from a fresh
+    snapshot, a shared in-flight fetch, or a new one across every configured tenant.
+    """
+    flight = _start_shared_fetch(config, dataset, fields, log=progress_callback or print)
+    return _collect_frame(flight, progress_callback=progress_callback, data_callback=data_callback)
+
 def send_email(sender_email, sender_password, recipients, subject, body, attachment_buffer, filename):
+    """Sends one report through the outbox (see mail_outbox.Outbox); True once delivered."""
     try:
-        msg = MIMEMultipart()
-        msg['From'] = sender_email
-        msg['To'] = recipients
-        msg['Subject'] = subject
-
-        msg.attach(MIMEText(body, 'plain'))
-
-        # Attachment
-        part = MIMEBase('application', 'octet-stream')
-        part.set_payload(attachment_buffer.getvalue())
-        encoders.encode_base64(part)
-        part.add_header('Content-Disposition', f"attachment; filename= {filename}")
-        msg.attach(part)
-
-        # SMTP Session
-        server = smtplib.SMTP('smtp.gmail.com', 587)
-        server.starttls()
-        server.login(sender_email, sender_password)
-        text = msg.as_string()
-        
-        recipient_list = [r.strip() for r in recipients.split(',')]
-        server.sendmail(sender_email, recipient_list, text)
-        server.quit()
-        print(f"Email sent successfully to: {recipients}")
-        return True
+        outbox = Outbox(sender_email, sender_password)
+        result = outbox.send(recipients, subject, body, attachments=[(filename, attachment_buffer.getvalue())])
     except Exception as e:
         print(f"Failed to send email. Error: {e}")
         return False
+    if result["status"] != "sent":
+        print(f"Failed to send email. Error: {result['error']}")
+        return False
+    print(f"Email sent successfully to: {recipients}")
+    return True
 
-def run_visa_report(config, progress_callback=None, data_callback=None):
+# --- Report builders ----------------------------------------------------------
+# A builder declares the fields it reads from each dataset; run_report_pipeline fetches
+# the union of every selected builder's fields once and hands each builder the frames.
+# build(data, today) gets data = {"clients": df or None, "applications": df or None} and
+# returns {"sheets": {sheet name: df}, "summary": [(label, count)], "message": str}.
+
+ReportBuilder = namedtuple(
+    "ReportBuilder", ["name", "title", "client_fields", "application_fields", "build", "filename", "recipients_key"]
+)
+REPORT_BUILDERS = {}
+
+def register_report(name, title, client_fields=(), application_fields=(), filename=None, recipients_key="recipients"):
+    """Decorator adding a builder to REPORT_BUILDERS (and so to the pipeline and scheduler)."""
+    def decorator(build):
+        REPORT_BUILDERS[name] = ReportBuilder(
+            name, title, list(client_fields), list(application_fields), build,
+            filename or title.replace(" ", "_"), recipients_key,
+        )
+        return build
+    return decorator
+
+def parse_expiry_dates(values):
+    """Vectorized parse_expiry_date: a Series of naive datetimes (wall-clock date kept), NaT if unparseable."""
+    text = values.astype("string")
+    # The first 19 characters are the local date and time; dropping the offset keeps the wall clock
+    parsed = pd.to_datetime(text.str.slice(0, 19), errors='coerce', format='ISO8601')
+    leftover = parsed.isna() & text.notna()
+    if leftover.any():
+        parsed[leftover] = pd.to_datetime(text[leftover].map(parse_expiry_date), errors='coerce')
+    return parsed
+
+@register_report("visa_expiry", "Weekly Visa Report", client_fields=VISA_COLUMNS, filename="Weekly_Report")
+def build_visa_expiry_report(data, today):
+    df = data["clients"]
+    # A streamed visa-only run holds just the expiry window, but counts every client it saw
+    total_records = df.attrs.get("total_records", len(df))
+    # Sorted once by expiry: every window below is a binary search, not a mask over all clients
+    index = ExpiryIndex(df, 'Visa Expiry Date', type_column='Visa Type', dates=parse_expiry_dates(df['Visa Expiry Date']))
+    three_months_out = today + timedelta(days=90)
+
+    # Filter 1: < 3 Months (Future expiries only) / Filter 2: SC 500 / Filter 3: SC 485
+    df_all = index.between(today, three_months_out)
+    df_500 = index.between(today, three_months_out, subclass="500")
+    df_485 = index.between(today, three_months_out, subclass="485")
+
+    buckets = index.buckets(today).rename_axis('Visa Subclass').reset_index()
+    return {
+        "sheets": {
+            'All < 3 Months': df_all,
+            'SC 500 < 3 Months': df_500,
+            'SC 485 < 3 Months': df_485,
+            'Expiry Buckets': buckets,
+        },
+        "summary": [("Total < 3 Months", len(df_all)), ("SC 500", len(df_500)), ("SC 485", len(df_485))],
+        "message": f"Found {len(df_all)} visas expiring in next 3 months (out of {total_records} clients).",
+    }
+
+COE_FIELDS = [
+    "Application ID", "Client Name", "Client Email", "Internal Client ID", "Product", "Partner",
+    "Workflow Name", "Current Stage", "Status", "Application Owner", "Last Updated",
+]
+
+@register_report("coe", "COE Report", application_fields=COE_FIELDS, recipients_key="coe_expiry_recipients")
+def build_coe_report(data, today):
+    df = data["applications"]
+    stage = df['Current Stage'].astype("string")
+    updated = pd.to_datetime(df['Last Updated'], errors='coerce', format='%d-%m-%Y')
+
+    # Applications sitting at a CoE stage, moved there within the past 18 months
+    at_coe = stage.str.contains("coe", case=False, na=False)
+    recent = (updated >= today - timedelta(days=18*30)) & (updated <= today)
+    df_coe = df[at_coe & recent].assign(**{'Last Updated': updated[at_coe & recent]})
+
+    return {
+        "sheets": {'COE Received 18M': df_coe},
+        "summary": [("COE Received (Past 18 Months)", len(df_coe))],
+        "message": f"Found {len(df_coe)} applications at a CoE stage in the past 18 months.",
+    }
+
+LEAD_FIELDS = ['Status', 'Workflow Name', 'Application Owner', 'Internal Client ID']
+
+def build_lead_summary(df):
     """
-    Runs the visa report automation with the provided configuration.
-    Returns a dictionary with status and logs.
+    Per-owner summary of "In Progress" applications (distinct clients, total, migration and
+    admission counts) plus a Grand Total row. Raises ValueError if a LEAD_FIELDS column is missing.
+    """
+    # Standardize columns
+    df = df.rename(columns=lambda column: str(column).strip())
+
+    # Check required columns
+    missing_cols = [col for col in LEAD_FIELDS if col not in df.columns]
+    if missing_cols:
+        raise ValueError(f"Missing columns: {', '.join(missing_cols)}")
+
+    # Filter: Status == "In Progress"
+    df_filtered = df[df['Status'] == 'In Progress'].copy()
+
+    # Categorize Application Type
+    workflow = df_filtered['Workflow Name'].astype("string").str.lower()
+    is_migration = workflow.str.contains("migration service|skills assessment|state government", na=False)
+    df_filtered['App_Type'] = is_migration.map({True: "Migration", False: "Admission"})
+
+    # Aggregation
+    # 1. Distinct Count of Internal Client ID
+    # 2. Count of Internal Client ID (Total Applications)
+    # 3. Count of Migration Apps
+    # 4. Count of Admission Apps
+    summary = df_filtered.groupby('Application Owner').agg(
+        Distinct_Clients=('Internal Client ID', 'nunique'),
+        Total_Applications=('Internal Client ID', 'count'),
+        Migration_Count=('App_Type', lambda x: (x == 'Migration').sum()),
+        Admission_Count=('App_Type', lambda x: (x == 'Admission').sum())
+    ).reset_index()
+
+    # Add Grand Total Row
+    total_row = pd.DataFrame({
+        'Application Owner': ['Grand Total'],
+        'Distinct_Clients': [df_filtered['Internal Client ID'].nunique()],
+        'Total_Applications': [len(df_filtered)],
+        'Migration_Count': [(df_filtered['App_Type'] == 'Migration').sum()],
+        'Admission_Count': [(df_filtered['App_Type'] == 'Admission').sum()]
+    })
+
+    return pd.concat([summary, total_row], ignore_index=True)
+
+@register_report("lead_summary", "Lead Report", application_fields=LEAD_FIELDS, recipients_key="lead_report_recipients")
+def build_lead_report(data, today):
+    summary = build_lead_summary(data["applications"])
+    in_progress = int(summary['Total_Applications'].iloc[-1])
+    return {
+        "sheets": {'Lead Summary': summary},
+        "summary": [("Applications In Progress", in_progress), ("Application Owners", len(summary) - 1)],
+        "message": f"Summarised {in_progress} in-progress applications across {len(summary) - 1} owners.",
+    }
+
+# --- Pipeline -----------------------------------------------------------------
+
+def _union(lists):
+    merged = []
+    for fields in lists:
+        merged.extend(field for field in fields if field not in merged)
+    return merged
+
+def _artifact_key(builder, data, datasets, date):
+    """Artifact cache key of one report: the rows it reads, its name, the report date and the code."""
+    frames = []
+    for dataset in datasets:
+        declared = builder.client_fields if dataset == "clients" else builder.application_fields
+        columns = [column for column in declared + [TENANT_COLUMN] if column in data[dataset].columns]
+        # Row order follows fetch completion, so only the rows themselves count
+        frames.append(frame_fingerprint(data[dataset][columns], ordered=False))
+        frames.append(data[dataset].attrs.get("total_records", len(data[dataset])))
+    return artifact_key(builder.name, str(date), code_version(sys.modules[__name__], report_workbook, expiry_index), *frames)
+
+def run_report_pipeline(config, reports=None, progress_callback=None, data_callback=None):
+    """
+    Runs several reports (names from REPORT_BUILDERS, default all) from one shared fetch:
+    clients and applications are each fetched once, with the union of the fields the
+    selected builders declare, and every report gets its own workbook and email.
+    Returns {"success", "logs", "message", "reports": {name: {"success", "message"}}}.
     """
     logs = []
     def log(message):
@@ -62,83 +317,134 @@ def run_visa_report(config, progress_callback=None, data_callback=None):
         if progress_callback:
             progress_callback(message)
 
-    log("Starting Visa Report Automation...")
-    
     try:
-        # 1. Fetch Data
-        client = AgentcisClient(config["agentcis_api_token"], config["agentcis_base_url"])
-        log("Fetching data (this may take a while)...")
-        
-        # Pass the log function as the callback
-        df = client.fetch_visa_data(limit=None, progress_callback=log, data_callback=data_callback) 
-        
-        if df.empty:
-            log("No data found.")
-            return {"success": False, "logs": logs, "message": "No data found."}
-
-        # 2. Process Data
-        log("Processing data...")
-        df['Visa Expiry Date'] = pd.to_datetime(df['Visa Expiry Date'], errors='coerce')
-        
+        builders = [REPORT_BUILDERS[name] for name in (reports or REPORT_BUILDERS)]
+    except KeyError as e:
+        message = f"Error: unknown report {e}; known: {', '.join(REPORT_BUILDERS)}"
+        log(message)
+        return {"success": False, "logs": logs, "message": message, "reports": {}}
+
+    log(f"Starting {', '.join(builder.title for builder in builders)} Automation...")
+    results = {}
+
+    try:
+        # 1. Fetch Data: both datasets start at once; a run that died part-way resumes from its checkpoint
+        fields = {
+            "clients": _union(builder.client_fields for builder in builders),
+            "applications": _union(builder.application_fields for builder in builders),
+        }
+        # The visa report alone only needs the expiry window, so its clients are streamed and
+        # bucketed; several reports share one full in-memory fetch instead
+        window_days = max(DEFAULT_HORIZONS) if [builder.name for builder in builders] == ["visa_expiry"] else None
+        flights = {
+            dataset: _start_shared_fetch(config, dataset, dataset_fields, resume=config.get("agentcis_resume", True),
+                                         log=log, window_days=window_days if dataset == "clients" else None)
+            for dataset, dataset_fields in fields.items() if dataset_fields
+        }
+        data = {dataset: None for dataset in fields}
+        for dataset, flight in flights.items():
+            data[dataset] = _collect_frame(flight, progress_callback=log, data_callback=data_callback)
+
         today = datetime.now()
-        three_months_out = today + timedelta(days=90)
-        
-        # Filter 1: < 3 Months (Future expiries only)
-        mask_time = (df['Visa Expiry Date'] >= today) & (df['Visa Expiry Date'] <= three_months_out)
-        df_all = df[mask_time].copy()
-        
-        # Filter 2: SC 500
-        mask_500 = df_all['Visa Type'].astype(str).str.contains("500", na=False)
-        df_500 = df_all[mask_500]
-        
-        # Filter 3: SC 485
-        mask_485 = df_all['Visa Type'].astype(str).str.contains("485", na=False)
-        df_485 = df_all[mask_485]
-        
-        log(f"Found {len(df_all)} visas expiring in next 3 months.")
-
-        # 3. Generate Excel
-        buffer = io.BytesIO()
-        with pd.ExcelWriter(buffer, engine='xlsxwriter') as writer:
-            df_all.to_excel(writer, sheet_name='All < 3 Months', index=False)
-            df_500.to_excel(writer, sheet_name='SC 500 < 3 Months', index=False)
-            df_485.to_excel(writer, sheet_name='SC 485 < 3 Months', index=False)
-        
-        # 4. Send Email
-        email_subject = f"Weekly Visa Report - {datetime.now().date()}"
-        email_body = f"""Hi Team,
-
-Please find attached the Weekly Visa Report for {datetime.now().date()}.
+        date = today.date()
+        outbox = Outbox.from_config(config)
+        cache = ArtifactCache.from_config(config)
+        queued = {}
+        for builder in builders:
+            # 2. Build the report
+            needed = [dataset for dataset, declared in (("clients", builder.client_fields),
+                                                         ("applications", builder.application_fields)) if declared]
+            if any(data[dataset] is None or data[dataset].attrs.get("total_records", len(data[dataset])) == 0
+                   for dataset in needed):
+                log(f"{builder.title}: No data found.")
+                results[builder.name] = {"success": False, "message": "No data found."}
+                continue
+
+            # Unchanged inputs (same data, date and code) reuse the workbook and body rendered last time
+            key = _artifact_key(builder, data, needed, date)
+            rendered = cache.get_json(key)
+            workbook = cache.get(key, "xlsx") if rendered else None
+            if workbook is not None:
+                log(f"{builder.title}: Data unchanged since the last run; reusing the rendered report.")
+                log(rendered["message"])
+                email_body = rendered["body"]
+            else:
+                log(f"{builder.title}: Processing data...")
+                try:
+                    report = builder.build(data, today)
+                except Exception as e:
+                    log(f"{builder.title}: Error: {e}")
+                    results[builder.name] = {"success": False, "message": f"Error: {str(e)}"}
+                    continue
+                log(report["message"])
+
+                # 3. Generate Excel (streamed through a temporary file, so large sheets stay out of memory)
+                workbook = workbook_bytes(report["sheets"])
+
+                # 4. Send Email
+                summary = "\n".join(f"- {label}: {count}" for label, count in report["summary"])
+                email_body = f"""Hi Team,
+
+Please find attached the {builder.title} for {date}.
 
 Summary:
-- Total < 3 Months: {len(df_all)}
-- SC 500: {len(df_500)}
-- SC 485: {len(df_485)}
+{summary}
 
 Regards,
 Ashish Shrestha"""
+                cache.put(key, "xlsx", workbook)
+                cache.put_json(key, {"message": report["message"], "body": email_body})
 
-        success = send_email(
-            config["sender_email"],
-            config["sender_password"],
-            config["recipients"],
-            email_subject,
-            email_body,
-            buffer,
-            f"Weekly_Report_{datetime.now().date()}.xlsx"
-        )
-        
-        if success:
-            log("Automation Complete. Email sent.")
-            return {"success": True, "logs": logs, "message": "Email sent successfully!"}
-        else:
-            log("Failed to send email.")
-            return {"success": False, "logs": logs, "message": "Failed to send email. Check credentials."}
+            # Queued on disk first; every report then goes out over one SMTP connection
+            queued[builder.name] = outbox.enqueue(
+                config.get(builder.recipients_key) or config["recipients"],
+                f"{builder.title} - {date}",
+                email_body,
+                attachments=[(f"{builder.filename}_{date}.xlsx", workbook)],
+            )
+
+        if queued:
+            log(f"Sending {len(queued)} email(s)...")
+            delivered = outbox.deliver()
+        for name, message_id in queued.items():
+            title = REPORT_BUILDERS[name].title
+            result = delivered.get(message_id, {"status": "deferred", "error": None})
+            if result["status"] == "sent":
+                log(f"{title}: Automation Complete. Email sent.")
+                results[name] = {"success": True, "message": "Email sent successfully!"}
+            elif result["status"] == "deferred":
+                log(f"{title}: Email queued in the outbox; delivery will be retried ({result['error']}).")
+                results[name] = {"success": False, "message": "Email queued; delivery will be retried."}
+            else:
+                log(f"{title}: Failed to send email. Error: {result['error']}")
+                results[name] = {"success": False, "message": "Failed to send email. Check credentials."}
 
     except Exception as e:
         log(f"Error: {str(e)}")
-        return {"success": False, "logs": logs, "message": f"Error: {str(e)}"}
+        return {"success": False, "logs": logs, "message": f"Error: {str(e)}", "reports": results}
+
+    if len(results) == 1:
+        message = next(iter(results.values()))["message"]
+    else:
+        message = "; ".join(f"{REPORT_BUILDERS[name].title}: {result['message']}" for name, result in results.items())
+    return {
+        "success": all(result["success"] for result in results.values()),
+        "logs": logs,
+        "message": message,
+        "reports": results,
+    }
+
+def run_visa_report(config, progress_callback=None, data_callback=None):
+    """
+    Runs the visa report automation with the provided configuration.
+    Returns a dictionary with status and logs.
+    """
+    return run_report_pipeline(config, ["visa_expiry"], progress_callback=progress_callback, data_callback=data_callback)
 
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Run reports from one shared Agentcis fetch")
+    parser.add_argument("reports", nargs="*", help=f"Reports to run (default: visa_expiry); known: {', '.join(REPORT_BUILDERS)}")
+    args = parser.parse_args()
     config = load_config()
-    run_visa_report(config)
+    run_report_pipeline(config, args.reports or ["visa_expiry"])
@@ -0,0 +1,165 @@
+import hashlib
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+import report_workbook
+
+DEFAULT_CACHE_DIR = "artifact_cache"
+DEFAULT_MAX_MB = 256
+
+_code_versions = {}
+
+
+def frame_fingerprint(df, ordered=True):
+    """
+    Content hash of a DataFrame's columns, dtypes and rows (the index is ignored). With
+    ordered=False the row order is ignored too, for data such as a concurrent fetch that
+    returns the same clients in a different order every time.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr(([str(column) for column in df.columns], [str(dtype) for dtype in df.dtypes])).encode())
+    try:
+        hashed = pd.util.hash_pandas_object(df, index=False)
+    except TypeError:
+        # Unhashable cells (lists, dicts): fall back to their text form
+        hashed = pd.util.hash_pandas_object(df.astype(str), index=False)
+    hashed = hashed.to_numpy()
+    digest.update((hashed if ordered else np.sort(hashed)).tobytes())
+    return digest.hexdigest()
+
+
+def code_version(*modules):
+    """Hash of the given modules' source files, so a code change invalidates what they rendered."""
+    key = tuple(module.__name__ for module in modules)
+    if key not in _code_versions:
+        digest = hashlib.blake2b(digest_size=16)
+        for module in modules:
+            with open(module.__file__, "rb") as f:
+                digest.update(f.read())
+        _code_versions[key] = digest.hexdigest()
+    return _code_versions[key]
+
+
+def artifact_key(*parts):
+    """
+    Cache key from report parameters: DataFrames contribute their frame_fingerprint,
+    bytes their hash and anything else its repr.
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    for part in parts:
+        if isinstance(part, pd.DataFrame):
+            part = frame_fingerprint(part)
+        elif isinstance(part, (bytes, bytearray)):
+            part = hashlib.blake2b(part, digest_size=16).hexdigest()
+        digest.update(repr(part).encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class ArtifactCache:
+    """
+    On-disk cache of rendered report artifacts (workbooks, email bodies) keyed by
+    artifact_key, i.e. by the input data, report parameters and code version. An
+    unchanged input therefore skips rendering entirely.
+
+    Each artifact is one file, <key>.<kind>. Reads refresh the file's mtime and writes
+    evict the least recently used files once the directory exceeds `max_bytes`.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_MB * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            config.get("artifact_cache_dir", DEFAULT_CACHE_DIR),
+            max_bytes=config.get("artifact_cache_max_mb", DEFAULT_MAX_MB) * 1024 * 1024,
+        )
+
+    def _path(self, key, kind):
+        return os.path.join(self.directory, f"{key}.{kind}")
+
+    def get(self, key, kind):
+        """The cached bytes, or None."""
+        path = self._path(key, kind)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return data
+
+    def put(self, key, kind, data):
+        """Stores bytes (str is stored as UTF-8) and evicts down to max_bytes."""
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        path = self._path(key, kind)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        self._evict()
+        return data
+
+    def get_text(self, key, kind):
+        data = self.get(key, kind)
+        return None if data is None else data.decode("utf-8")
+
+    def get_json(self, key, kind="json"):
+        text = self.get_text(key, kind)
+        return None if text is None else json.loads(text)
+
+    def put_json(self, key, value, kind="json"):
+        self.put(key, kind, json.dumps(value))
+
+    def get_or_create(self, key, kind, build):
+        """Cached bytes for (key, kind), calling build() and storing its result on a miss."""
+        data = self.get(key, kind)
+        if data is None:
+            data = self.put(key, kind, build())
+        return data
+
+    def _evict(self):
+        with self._lock:
+            entries = []
+            for filename in os.listdir(self.directory):
+                if filename.endswith(".tmp"):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(self.directory, filename))
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, filename))
+            total = sum(size for _, size, _ in entries)
+            for _, size, filename in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(os.path.join(self.directory, filename))
+                except FileNotFoundError:
+                    pass
+                total -= size
+
+
+def cached_workbook_bytes(sheets, *params, cache=None):
+    """
+    workbook_bytes(sheets) served from the artifact cache: the key is every sheet's name
+    and content plus `params` and the writer's code, so a Streamlit rerun over the same
+    data reuses the rendered file.
+    """
+    cache = cache or ArtifactCache()
+    key = artifact_key("workbook", code_version(report_workbook), params,
+                       *((name, frame_fingerprint(df)) for name, df in sheets.items()))
+    return cache.get_or_create(key, "xlsx", lambda: report_workbook.workbook_bytes(sheets))
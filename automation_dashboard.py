@@ -1,10 +1,12 @@
 import streamlit as st
 import json
 import os
-import sys
 import pandas as pd
 from datetime import datetime
 from app_automated import run_visa_report
+from live_preview import LivePreview
+from prefetch_service import PrefetchService, dataset_freshness, DEFAULT_INTERVAL_MINUTES
+from scheduler import Scheduler, JOB_TYPES, weekly_rule
 
 # Page Config
 st.set_page_config(page_title="Visa Automation Control Panel", page_icon="⚙️", layout="wide")
@@ -29,6 +31,19 @@ st.title("⚙️ Visa Automation Control Panel")
 # Load Config
 config = load_config()
 
+@st.cache_resource
+def start_prefetch_service():
+    # One background refresher per server process, shared by every session
+    return PrefetchService(load_config()).start()
+
+if config.get("prefetch_enabled"):
+    start_prefetch_service()
+
+@st.cache_resource
+def start_scheduler():
+    # Scheduled reports run in this process; job locks keep a standalone scheduler.py from doubling up
+    return Scheduler().start()
+
 # Tabs
 tab1, tab2, tab3 = st.tabs(["🚀 Run Report", "🛠️ Settings", "📅 Schedule"])
 
@@ -37,24 +52,35 @@ with tab1:
     st.header("Manual Trigger")
     st.write("Click the button below to fetch data from Agentcis and email the report immediately.")
     
+    # How warm the prefetched snapshots are (reports use them instead of a live fetch when fresh)
+    freshness = dataset_freshness(config)
+    fresh_cols = st.columns(len(freshness))
+    for col, (dataset, info) in zip(fresh_cols, freshness.items()):
+        if info["refreshed_at"] is None:
+            col.caption(f"**{dataset.title()}**: not prefetched")
+        else:
+            state = "fresh" if info["fresh"] else "stale"
+            error = f" · last refresh failed: {info['error']}" if info["error"] else ""
+            col.caption(
+                f"**{dataset.title()}**: {info['rows']} rows, refreshed {info['age_minutes']:.0f} min ago "
+                f"({state}){error}"
+            )
+    
     if st.button("▶️ Run Report Now", type="primary"):
         with st.status("Running Automation...", expanded=True) as status:
             log_container = st.empty()
+            stats_container = st.empty()
             table_container = st.empty()
             
-            all_preview_data = []
+            # Last 100 clients plus running counters, redrawn at most twice a second
+            preview = LivePreview(table_container, stats_container, max_rows=100, min_interval=0.5)
             
             def dashboard_log(message):
                 log_container.text(f"⏳ {message}")
-                
-            def dashboard_data(batch):
-                all_preview_data.extend(batch)
-                # Show last 100 items to avoid UI lag, or all if small
-                df_preview = pd.DataFrame(all_preview_data)
-                table_container.dataframe(df_preview.tail(100), use_container_width=True)
             
             # Run the automation
-            result = run_visa_report(config, progress_callback=dashboard_log, data_callback=dashboard_data)
+            result = run_visa_report(config, progress_callback=dashboard_log, data_callback=preview.add)
+            preview.finish()
             
             # Final logs display
             log_text = "\n".join(result.get("logs", []))
@@ -86,13 +112,23 @@ with tab2:
     st.subheader("Report Settings")
     recipients = st.text_area("Recipients (comma separated)", value=config.get("recipients", ""))
     
+    st.subheader("Prefetch")
+    prefetch_enabled = st.checkbox("Keep Agentcis data warm in the background", value=config.get("prefetch_enabled", False))
+    prefetch_interval = st.number_input(
+        "Refresh every (minutes)", min_value=5, value=int(config.get("prefetch_interval_minutes", DEFAULT_INTERVAL_MINUTES))
+    )
+    
     if st.button("💾 Save Settings"):
+        # Keep keys that are not edited here (concurrency, store path, ...)
         new_config = {
+            **config,
             "agentcis_api_token": api_token,
             "agentcis_base_url": base_url,
             "sender_email": sender_email,
             "sender_password": sender_password,
-            "recipients": recipients
+            "recipients": recipients,
+            "prefetch_enabled": prefetch_enabled,
+            "prefetch_interval_minutes": prefetch_interval,
         }
         save_config(new_config)
         st.success("Settings saved successfully!")
@@ -102,63 +138,68 @@ with tab2:
 # --- TAB 3: SCHEDULE ---
 with tab3:
     st.header("Schedule Automation")
-    st.write("Configure the automation to run automatically in the background.")
+    st.write("Reports run inside this control panel's process (or `python scheduler.py` on a server), on any OS.")
     
-    import subprocess
+    scheduler = start_scheduler()
+    jobs = scheduler.jobs()
     
-    TASK_NAME = "VisaReportAutomator"
-    python_path = sys.executable
-    script_path = os.path.abspath("app_automated.py")
+    if jobs:
+        for job in jobs:
+            col1, col2, col3, col4 = st.columns([3, 2, 1, 1])
+            next_run = scheduler.next_run(job)
+            last_run = datetime.fromtimestamp(job["last_run_at"]).strftime("%d %b %H:%M") if job.get("last_run_at") else "never"
+            col1.markdown(f"**{job['name']}** · `{job['cron']}` · {job['job_type']}")
+            col2.caption(
+                f"{'✅ Enabled' if job['enabled'] else '⏸️ Disabled'} · last run {last_run}"
+                + (f" · next {next_run:%a %d %b %H:%M}" if next_run else "")
+            )
+            if col3.button("Disable" if job["enabled"] else "Enable", key=f"toggle_{job['name']}"):
+                scheduler.set_enabled(job["name"], not job["enabled"])
+                st.rerun()
+            if col4.button("Delete", key=f"delete_{job['name']}"):
+                scheduler.remove_job(job["name"])
+                st.rerun()
+    else:
+        st.warning("⚠️ No scheduled jobs yet.")
+    
+    st.subheader("Add Job")
+    col1, col2 = st.columns(2)
+    with col1:
+        job_name = st.text_input("Job Name", value="Weekly Visa Report")
+        job_type = st.selectbox("Report", sorted(JOB_TYPES), index=sorted(JOB_TYPES).index("visa_report"))
+        catch_up = st.checkbox("Run once on start-up if a run was missed", value=True)
+    with col2:
+        day = st.selectbox("Day of Week", ["MON", "TUE", "WED", "THU", "FRI", "SAT", "SUN"], index=0)
+        time = st.time_input("Time", value=datetime.strptime("09:00", "%H:%M").time())
+        custom_cron = st.text_input("Or a cron rule (min hour day month weekday)", value="",
+                                    help="e.g. 0 8 * * MON-FRI; overrides day and time")
     
-    # Check status
-    def is_task_scheduled():
+    if st.button("Add Schedule", type="primary"):
         try:
-            # Check if task exists
-            cmd = f'schtasks /Query /TN "{TASK_NAME}"'
-            result = subprocess.run(cmd, capture_output=True, text=True, shell=True)
-            return result.returncode == 0
-        except:
-            return False
-
-    is_scheduled = is_task_scheduled()
+            scheduler.add_job(job_name, custom_cron.strip() or weekly_rule(day, time), job_type=job_type, catch_up=catch_up)
+            st.success("Schedule added!")
+            st.rerun()
+        except ValueError as e:
+            st.error(f"Invalid schedule: {e}")
     
-    if is_scheduled:
-        st.success(f"✅ Automation is currently **ENABLED**.")
-        if st.button("Disable Schedule", type="primary"):
-            cmd = f'schtasks /Delete /TN "{TASK_NAME}" /F'
-            result = subprocess.run(cmd, capture_output=True, text=True, shell=True)
-            if result.returncode == 0:
-                st.success("Schedule disabled successfully!")
-                st.rerun()
-            else:
-                st.error(f"Failed to disable: {result.stderr}")
-    else:
-        st.warning("⚠️ Automation is currently **DISABLED**.")
-        
-        col1, col2 = st.columns(2)
-        with col1:
-            day = st.selectbox("Day of Week", ["MON", "TUE", "WED", "THU", "FRI", "SAT", "SUN"], index=0)
-        with col2:
-            time = st.time_input("Time", value=datetime.strptime("09:00", "%H:%M").time())
-            
-        if st.button("Enable Schedule"):
-            time_str = time.strftime("%H:%M")
-            # Create task
-            # /SC WEEKLY /D <DAY> /ST <TIME> /TR "<PYTHON> <SCRIPT>" /RL HIGHEST
-            # Note: /RL HIGHEST might require admin, but usually standard user can create tasks for themselves
-            
-            # We wrap the command in quotes to handle spaces in paths
-            action = f'"{python_path}" "{script_path}"'
-            
-            cmd = f'schtasks /Create /SC WEEKLY /D {day} /TN "{TASK_NAME}" /TR "\'{python_path}\' \'{script_path}\'" /ST {time_str} /F'
-            
-            # Use subprocess to run
-            result = subprocess.run(cmd, capture_output=True, text=True, shell=True)
-            
-            if result.returncode == 0:
-                st.success("Schedule enabled successfully!")
-                st.rerun()
+    if jobs:
+        run_now = st.selectbox("Run a job now", [job["name"] for job in jobs])
+        if st.button("▶️ Run Now"):
+            with st.spinner(f"Running {run_now}..."):
+                entry = scheduler.run_job(run_now)
+            if entry is None:
+                st.info(f"{run_now} is already running.")
+            elif entry["success"]:
+                st.success(f"{run_now} finished in {entry['duration_seconds']}s: {entry['message']}")
             else:
-                st.error(f"Failed to enable schedule. Error: {result.stderr}")
-                st.info("Try running the dashboard as Administrator if permission is denied.")
-                st.code(cmd, language="powershell")
+                st.error(f"{run_now} failed: {entry['message']}")
+    
+    history = scheduler.history()
+    if history:
+        st.subheader("Run History")
+        history_df = pd.DataFrame(history)
+        history_df["started_at"] = history_df["started_at"].map(lambda ts: datetime.fromtimestamp(ts).strftime("%d %b %Y %H:%M"))
+        st.dataframe(
+            history_df[["started_at", "job", "trigger", "duration_seconds", "success", "message"]],
+            use_container_width=True,
+        )
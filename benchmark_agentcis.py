@@ -0,0 +1,197 @@
+"""
+Throughput benchmark for AgentcisClient.fetch_visa_data against mock_agentcis_server.
+
+Each (engine, clients, concurrency) combination runs in a fresh process so peak RSS
+belongs to that run alone. Reports clients/sec, p50/p95/p99 request latency, peak RSS
+and how many attempts were throttled or failed.
+
+Engines:
+    baseline  the original fetch path: list pages one by one, then one plain requests.get
+              per client on a ThreadPoolExecutor (the original ran 100 workers), no retries
+    async     the current client on aiohttp
+    threads   the current client with aiohttp disabled (requests on a bounded thread pool)
+
+    python benchmark_agentcis.py --clients 1000,8000 --concurrency 25,100,200 --latency-ms 40
+    python benchmark_agentcis.py --engines baseline,async --max-inflight 80 --error-rate 0.01
+"""
+import argparse
+import concurrent.futures
+import multiprocessing
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Windows: peak RSS is reported as n/a
+    resource = None
+
+from mock_agentcis_server import MockAgentcisServer
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(int(round(pct / 100 * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS, kilobytes on Linux
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def _baseline_fetch(base_url, token, workers, on_request):
+    """The pre-async AgentcisClient.fetch_visa_data, kept as the reference the engines are measured against."""
+    import pandas as pd
+    import requests
+
+    headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json", "Accept": "application/json"}
+
+    def timed(method, url, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = requests.request(method, url, headers=headers, **kwargs)
+        except Exception:
+            on_request(method, url, None, time.perf_counter() - started)
+            raise
+        on_request(method, url, response.status_code, time.perf_counter() - started)
+        return response
+
+    # 1. Client list, one page after another
+    all_clients = []
+    page = 1
+    while True:
+        try:
+            response = timed("POST", f"{base_url}/api/v2/clients/list", json={"page": page, "limit": 50})
+        except Exception:
+            break
+        if response.status_code != 200:
+            break
+        data = response.json()
+        batch = data.get('data', [])
+        if not batch:
+            break
+        all_clients.extend(batch)
+        if page >= data.get('meta', {}).get('last_page', 1):
+            break
+        page += 1
+
+    # 2. One detail request per client on a thread pool, a new connection each time
+    def fetch_single_client(client):
+        try:
+            response = timed("GET", f"{base_url}/api/v2/clients/{client.get('id')}")
+        except Exception:
+            return None
+        if response.status_code != 200:
+            return None
+        client_data = response.json().get('data', {})
+        visa_expiry_obj = client_data.get('visa_expiry_date')
+        return {
+            "Client Name": client_data.get('full_name'),
+            "Visa Type": client_data.get('visa_type'),
+            "Visa Expiry Date": visa_expiry_obj.get('actual') if visa_expiry_obj else None,
+            "Email": client_data.get('email', {}).get('primary'),
+            "Phone": client_data.get('phone', {}).get('formatted'),
+        }
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        rows = [row for row in executor.map(fetch_single_client, all_clients) if row]
+    return pd.DataFrame(rows)
+
+
+def _run_one(base_url, engine, concurrency, results):
+    import agentcis_client
+
+    latencies = []
+    statuses = {"throttled": 0, "failed": 0}
+    lock = threading.Lock()
+
+    def on_request(method, url, status, elapsed):
+        with lock:
+            latencies.append(elapsed)
+            if status is None:
+                statuses["failed"] += 1
+            elif status == 429 or status >= 500:
+                statuses["throttled"] += 1
+
+    if engine == "baseline":
+        started = time.perf_counter()
+        df = _baseline_fetch(base_url, "benchmark-token", concurrency, on_request)
+        elapsed = time.perf_counter() - started
+    else:
+        if engine == "threads":
+            agentcis_client.aiohttp = None
+        client = agentcis_client.AgentcisClient("benchmark-token", base_url, concurrency=concurrency)
+        client.request_hook = on_request
+        started = time.perf_counter()
+        df = client.fetch_visa_data(progress_callback=lambda msg: None)
+        elapsed = time.perf_counter() - started
+        client.close()
+
+    latencies.sort()
+    results.put({
+        "records": len(df),
+        "seconds": elapsed,
+        "requests": len(latencies),
+        "p50": _percentile(latencies, 50) * 1000,
+        "p95": _percentile(latencies, 95) * 1000,
+        "p99": _percentile(latencies, 99) * 1000,
+        "peak_rss_mb": _peak_rss_mb(),
+        **statuses,
+    })
+
+
+def _int_list(value):
+    return [int(v) for v in value.split(",") if v]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark AgentcisClient against a local mock server")
+    parser.add_argument("--clients", type=_int_list, default=[1000])
+    parser.add_argument("--concurrency", type=_int_list, default=[25, 100])
+    parser.add_argument("--engines", default="baseline,async,threads", help="Comma-separated: baseline, async, threads")
+    parser.add_argument("--latency-ms", type=float, default=40.0)
+    parser.add_argument("--jitter-ms", type=float, default=10.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--max-inflight", type=int, default=None)
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context("spawn")
+    header = (f"{'engine':<8} {'clients':>7} {'conc':>5} {'records':>7} {'secs':>7} {'clients/s':>9} "
+              f"{'p50 ms':>7} {'p95 ms':>7} {'p99 ms':>7} {'RSS MB':>7} {'429/5xx':>7} {'errors':>6}")
+    print(header)
+    print("-" * len(header))
+
+    for clients in args.clients:
+        server = MockAgentcisServer(
+            clients=clients, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+            error_rate=args.error_rate, throttle_rate=args.throttle_rate, max_inflight=args.max_inflight,
+        )
+        base_url = server.start()
+        try:
+            for engine in args.engines.split(","):
+                for concurrency in args.concurrency:
+                    results = ctx.Queue()
+                    process = ctx.Process(target=_run_one, args=(base_url, engine, concurrency, results))
+                    process.start()
+                    result = results.get()
+                    process.join()
+
+                    rss = f"{result['peak_rss_mb']:.0f}" if result["peak_rss_mb"] is not None else "n/a"
+                    print(
+                        f"{engine:<8} {clients:>7} {concurrency:>5} {result['records']:>7} "
+                        f"{result['seconds']:>7.2f} {result['records'] / result['seconds']:>9.0f} "
+                        f"{result['p50']:>7.1f} {result['p95']:>7.1f} {result['p99']:>7.1f} {rss:>7} "
+                        f"{result['throttled']:>7} {result['failed']:>6}"
+                    )
+        finally:
+            server.stop()
+
+
+if __name__ == "__main__":
+    main()
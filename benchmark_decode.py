@@ -0,0 +1,49 @@
+"""
+CPU cost of decoding Agentcis client detail payloads with each installed JSON backend.
+
+Decodes dump_api_v2_clients_613.json N times (default 10k) the way AgentcisClient does:
+the stdlib baseline is json.loads of the full document, the others are DetailDecoder
+backends that keep only the catalog fields.
+
+    python benchmark_decode.py --payloads 10000
+"""
+import argparse
+import json
+import time
+
+from agentcis_client import CLIENT_FIELDS
+from agentcis_decode import DetailDecoder, available_backends
+
+
+def _baseline(content):
+    return json.loads(content).get('data', {})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmark of detail payload decoding")
+    parser.add_argument("--payloads", type=int, default=10000)
+    parser.add_argument("--sample", default="dump_api_v2_clients_613.json")
+    args = parser.parse_args()
+
+    with open(args.sample, "rb") as f:
+        content = f.read()
+    keys = {field.key for field in CLIENT_FIELDS.values()}
+
+    candidates = [("json (full decode)", _baseline)]
+    candidates += [(f"{name} (catalog fields)", DetailDecoder(keys, backend=name)) for name in available_backends()]
+
+    print(f"{len(content)} byte payload x {args.payloads}")
+    print(f"{'decoder':<28} {'CPU s / N':>10} {'us / payload':>13} {'saved':>7}")
+    baseline = None
+    for name, decode in candidates:
+        decode(content)
+        started = time.process_time()
+        for _ in range(args.payloads):
+            decode(content)
+        cpu = time.process_time() - started
+        baseline = baseline or cpu
+        print(f"{name:<28} {cpu:>10.3f} {cpu / args.payloads * 1e6:>13.1f} {1 - cpu / baseline:>7.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+
+DEFAULT_HORIZONS = (30, 60, 90, 180)
+DEFAULT_SUBCLASSES = ("500", "485")
+ALL = "All"
+
+
+class ExpiryIndex:
+    """
+    Rows of a frame sorted once by a date column, so any date window is two binary
+    searches instead of a mask over the whole frame.
+
+    The type column (e.g. Visa Type) is held as categorical codes in the same sorted
+    order; matching a subclass like "500" is done once per distinct category rather than
+    once per row. Rows whose date is missing or unparseable are not indexed.
+
+        index = ExpiryIndex(df, 'Visa Expiry Date', type_column='Visa Type')
+        df_500 = index.between(today, today + timedelta(days=90), subclass="500")
+        index.buckets(today)    # 30/60/90/180-day counts per subclass
+    """
+
+    def __init__(self, df, date_column, type_column=None, dates=None):
+        if dates is None:
+            dates = pd.to_datetime(df[date_column], errors='coerce')
+        if isinstance(dates.dtype, pd.DatetimeTZDtype):
+            dates = dates.dt.tz_localize(None)
+        self.frame = df
+        self.date_column = date_column
+        self.dates = dates
+        values = dates.to_numpy(dtype="datetime64[ns]")
+
+        valid = np.flatnonzero(~np.isnat(values))
+        order = np.argsort(values[valid], kind="stable")
+        # Frame positions in date order, and their dates (the searchable keys)
+        self.positions = valid[order]
+        self.sorted_dates = values[self.positions]
+
+        self.type_column = type_column
+        self._subclass_cumsums = {}
+        if type_column is not None:
+            types = df[type_column].astype("category")
+            self.categories = types.cat.categories.astype(str)
+            self.type_codes = types.cat.codes.to_numpy()[self.positions]
+
+    def __len__(self):
+        return len(self.positions)
+
+    def span(self, start, end):
+        """Slice bounds in sorted order of the rows with start <= date <= end."""
+        lo = np.searchsorted(self.sorted_dates, np.datetime64(pd.Timestamp(start), "ns"), side="left")
+        hi = np.searchsorted(self.sorted_dates, np.datetime64(pd.Timestamp(end), "ns"), side="right")
+        return lo, max(lo, hi)
+
+    def subclass_mask(self, subclass):
+        """Sorted-order mask of rows whose type contains `subclass` (tested once per category)."""
+        matching = np.flatnonzero(self.categories.str.contains(subclass, regex=False))
+        return np.isin(self.type_codes, matching)
+
+    def _cumsum(self, subclass):
+        # Running count of matching rows in sorted order: any window's count is two lookups
+        if subclass not in self._subclass_cumsums:
+            mask = np.ones(len(self), dtype=bool) if subclass is None else self.subclass_mask(subclass)
+            self._subclass_cumsums[subclass] = np.concatenate(([0], np.cumsum(mask)))
+        return self._subclass_cumsums[subclass]
+
+    def count(self, start, end, subclass=None):
+        lo, hi = self.span(start, end)
+        cumsum = self._cumsum(subclass)
+        return int(cumsum[hi] - cumsum[lo])
+
+    def between(self, start, end, subclass=None):
+        """
+        Rows with start <= date <= end (optionally only `subclass`), in the frame's original
+        order, with the date column replaced by the parsed dates.
+        """
+        lo, hi = self.span(start, end)
+        positions = self.positions[lo:hi]
+        if subclass is not None:
+            positions = positions[self.subclass_mask(subclass)[lo:hi]]
+        positions = np.sort(positions)
+        rows = self.frame.iloc[positions]
+        return rows.assign(**{self.date_column: self.dates.iloc[positions].to_numpy()})
+
+    def buckets(self, today, horizons=DEFAULT_HORIZONS, subclasses=DEFAULT_SUBCLASSES):
+        """
+        Counts of rows dated within each horizon (days from `today`, inclusive) for all rows
+        and each subclass: a DataFrame indexed by ["All", *subclasses] with one
+        "< N days" column per horizon. One search per horizon, one cumsum per subclass.
+        """
+        start = np.datetime64(pd.Timestamp(today), "ns")
+        ends = [np.datetime64(pd.Timestamp(today) + pd.Timedelta(days=days), "ns") for days in horizons]
+        lo = np.searchsorted(self.sorted_dates, start, side="left")
+        his = np.maximum(np.searchsorted(self.sorted_dates, ends, side="right"), lo)
+
+        groups = [None] + ([] if self.type_column is None else list(subclasses))
+        counts = [self._cumsum(group)[his] - self._cumsum(group)[lo] for group in groups]
+        return pd.DataFrame(
+            counts,
+            index=[ALL if group is None else group for group in groups],
+            columns=[f"< {days} days" for days in horizons],
+        )
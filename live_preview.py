@@ -0,0 +1,52 @@
+import time
+from collections import deque
+
+import pandas as pd
+
+
+class LivePreview:
+    """
+    Streamlit preview of rows arriving in batches (one per client list page).
+
+    Keeps only the most recent `max_rows` rows in a ring buffer plus running counters, so
+    each batch costs O(batch) no matter how many pages came before. Redraws are throttled
+    by wall-clock time (at most one every `min_interval` seconds) rather than by batch
+    count; call finish() at the end to draw the final state.
+    """
+
+    def __init__(self, table_container, stats_container=None, max_rows=100, min_interval=0.5):
+        self.table_container = table_container
+        self.stats_container = stats_container
+        self.min_interval = min_interval
+        self.rows = deque(maxlen=max_rows)
+        self.total = 0
+        self.pages = 0
+        self._started = time.monotonic()
+        self._last_render = None
+
+    @property
+    def rate(self):
+        """Rows per second since the preview started."""
+        elapsed = time.monotonic() - self._started
+        return self.total / elapsed if elapsed > 0 else 0.0
+
+    def add(self, batch):
+        self.rows.extend(batch)
+        self.total += len(batch)
+        self.pages += 1
+        now = time.monotonic()
+        if self._last_render is None or now - self._last_render >= self.min_interval:
+            self.render()
+
+    def render(self):
+        self._last_render = time.monotonic()
+        if self.stats_container is not None:
+            self.stats_container.markdown(
+                f"**{self.total:,}** clients listed · **{self.pages:,}** pages · **{self.rate:,.0f}** clients/s"
+            )
+        if self.rows:
+            self.table_container.dataframe(pd.DataFrame(list(self.rows)), use_container_width=True)
+
+    def finish(self):
+        if self.pages:
+            self.render()
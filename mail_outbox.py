@@ -0,0 +1,339 @@
+"""
+Shared email delivery for every report.
+
+Messages are written to a disk outbox (outbox/<id>.eml plus <id>.json) before any
+network I/O, so an email generated just before a crash is still delivered by the next
+deliver() call. Delivery hands the pending messages to a few worker threads that each
+open one authenticated SMTP connection (STARTTLS and login once) and reuse it for their
+whole share of the batch. Transient failures (disconnects, timeouts, 4xx replies) are
+retried with exponential backoff; permanent ones (5xx, bad credentials) move the message
+to outbox/failed/. Passwords are never written to disk: an Outbox only delivers the
+messages of the account it was created with.
+
+    python mail_outbox.py      # deliver whatever is pending for config.json's sender
+"""
+import json
+import os
+import random
+import smtplib
+import threading
+import time
+import uuid
+from email import encoders
+from email.mime.base import MIMEBase
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+DEFAULT_OUTBOX_DIR = "outbox"
+SMTP_HOST = "smtp.gmail.com"
+SMTP_PORT = 587
+SMTP_TIMEOUT_SECONDS = 30
+DEFAULT_WORKERS = 2
+# A second connection only pays for itself on large batches (and Gmail limits concurrent logins)
+MESSAGES_PER_WORKER = 20
+# Attempts per message within one deliver() call before it is deferred to the next call
+MAX_ATTEMPTS = 4
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 30.0
+# A message still undelivered after this long is stale (e.g. last week's report) and dropped to failed/
+EXPIRE_AFTER_SECONDS = 24 * 3600
+# A claim older than this belongs to a process that died mid-delivery
+STALE_CLAIM_SECONDS = 15 * 60
+
+
+def split_recipients(recipients):
+    """'a@x.com, b@y.com' or a list -> ['a@x.com', 'b@y.com']."""
+    if isinstance(recipients, str):
+        recipients = recipients.split(',')
+    return [r.strip() for r in recipients if r and r.strip()]
+
+
+def build_message(sender, recipients, subject, body, html=False, attachments=()):
+    """A MIME message with a plain or HTML body and (filename, bytes) attachments."""
+    msg = MIMEMultipart()
+    msg['From'] = sender
+    msg['To'] = ", ".join(split_recipients(recipients))
+    msg['Subject'] = subject
+    msg.attach(MIMEText(body, 'html' if html else 'plain'))
+
+    for filename, payload in attachments:
+        part = MIMEBase('application', 'octet-stream')
+        part.set_payload(payload)
+        encoders.encode_base64(part)
+        part.add_header('Content-Disposition', 'attachment', filename=filename)
+        msg.attach(part)
+    return msg
+
+
+def _is_transient(error):
+    if isinstance(error, smtplib.SMTPAuthenticationError):
+        return False
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(400 <= code < 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    if isinstance(error, smtplib.SMTPException):
+        return isinstance(error, smtplib.SMTPServerDisconnected)
+    # Timeouts, refused or reset connections
+    return isinstance(error, OSError)
+
+
+def _write_json(path, data):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=4)
+    os.replace(tmp_path, path)
+
+
+class Outbox:
+    """
+    Disk-backed queue plus pooled SMTP delivery for one sender account.
+
+    enqueue() persists a message and returns its id; deliver() sends everything pending
+    for this sender and returns {id: {"status": "sent" | "failed" | "deferred", "error",
+    "attempts"}}. send() is enqueue + deliver for a single message. Messages are claimed
+    by renaming <id>.json to <id>.sending, so two processes sharing the outbox (the
+    control panel and the scheduler daemon) never send the same message twice.
+    """
+
+    def __init__(self, sender_email, sender_password, directory=DEFAULT_OUTBOX_DIR, host=SMTP_HOST, port=SMTP_PORT,
+                 workers=DEFAULT_WORKERS, max_attempts=MAX_ATTEMPTS):
+        self.sender_email = sender_email
+        self.sender_password = sender_password
+        self.directory = directory
+        self.host = host
+        self.port = port
+        self.workers = max(int(workers), 1)
+        self.max_attempts = max(int(max_attempts), 1)
+        self.connections_opened = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    @classmethod
+    def from_config(cls, config):
+        """Builds an Outbox from config.json keys (sender_email, sender_password, outbox_dir, smtp_*)."""
+        return cls(
+            config["sender_email"],
+            config["sender_password"],
+            directory=config.get("outbox_dir", DEFAULT_OUTBOX_DIR),
+            host=config.get("smtp_host", SMTP_HOST),
+            port=config.get("smtp_port", SMTP_PORT),
+            workers=config.get("smtp_workers", DEFAULT_WORKERS),
+        )
+
+    # --- Queue ----------------------------------------------------------------
+
+    def _path(self, message_id, extension):
+        return os.path.join(self.directory, f"{message_id}.{extension}")
+
+    def enqueue(self, recipients, subject, body, html=False, attachments=()):
+        """Persists a message for delivery and returns its id."""
+        recipient_list = split_recipients(recipients)
+        if not recipient_list:
+            raise ValueError("No recipients given")
+        # Time-ordered ids, so a directory listing is the delivery order
+        message_id = f"{time.time_ns()}-{uuid.uuid4().hex[:8]}"
+        msg = build_message(self.sender_email, recipient_list, subject, body, html=html, attachments=attachments)
+        with open(self._path(message_id, "eml.tmp"), "wb") as f:
+            f.write(msg.as_bytes())
+        os.replace(self._path(message_id, "eml.tmp"), self._path(message_id, "eml"))
+        # The metadata file is written last: its presence is what makes the message pending
+        _write_json(self._path(message_id, "json"), {
+            "id": message_id,
+            "sender": self.sender_email,
+            "recipients": recipient_list,
+            "subject": subject,
+            "created_at": time.time(),
+            "attempts": 0,
+            "next_attempt_at": 0,
+            "last_error": None,
+        })
+        return message_id
+
+    def pending(self):
+        """Metadata of every message waiting in the outbox (any sender), oldest first."""
+        entries = []
+        for filename in sorted(os.listdir(self.directory)):
+            if filename.endswith(".json"):
+                try:
+                    with open(os.path.join(self.directory, filename), "r") as f:
+                        entries.append(json.load(f))
+                except (OSError, ValueError):
+                    continue
+        return entries
+
+    def _reclaim_stale(self):
+        for filename in os.listdir(self.directory):
+            if not filename.endswith(".sending"):
+                continue
+            path = os.path.join(self.directory, filename)
+            try:
+                if time.time() - os.path.getmtime(path) > STALE_CLAIM_SECONDS:
+                    os.replace(path, path[:-len(".sending")] + ".json")
+            except FileNotFoundError:
+                pass
+
+    def _claim(self, ids=None):
+        """Claims this sender's due messages; returns their metadata in delivery order."""
+        self._reclaim_stale()
+        now = time.time()
+        claimed = []
+        for meta in self.pending():
+            if meta.get("sender") != self.sender_email or (ids is not None and meta["id"] not in ids):
+                continue
+            if meta.get("next_attempt_at", 0) > now:
+                continue
+            try:
+                os.rename(self._path(meta["id"], "json"), self._path(meta["id"], "sending"))
+            except FileNotFoundError:
+                continue  # claimed by another worker or process
+            claimed.append(meta)
+        return claimed
+
+    def _settle(self, meta, status):
+        message_id = meta["id"]
+        if status == "sent":
+            for extension in ("eml", "sending"):
+                try:
+                    os.remove(self._path(message_id, extension))
+                except FileNotFoundError:
+                    pass
+        elif status == "failed":
+            failed_dir = os.path.join(self.directory, "failed")
+            os.makedirs(failed_dir, exist_ok=True)
+            try:
+                os.replace(self._path(message_id, "eml"), os.path.join(failed_dir, f"{message_id}.eml"))
+            except FileNotFoundError:
+                pass  # the body itself was lost; keep the metadata and error
+            _write_json(os.path.join(failed_dir, f"{message_id}.json"), meta)
+            os.remove(self._path(message_id, "sending"))
+        else:  # deferred: back to pending, due again after a backoff
+            meta["next_attempt_at"] = time.time() + self._backoff(meta["attempts"])
+            _write_json(self._path(message_id, "sending"), meta)
+            os.replace(self._path(message_id, "sending"), self._path(message_id, "json"))
+        return {"status": status, "error": meta.get("last_error"), "attempts": meta["attempts"]}
+
+    # --- Delivery -------------------------------------------------------------
+
+    @staticmethod
+    def _backoff(attempt):
+        delay = min(BACKOFF_BASE_SECONDS * 2 ** max(attempt - 1, 0), BACKOFF_MAX_SECONDS)
+        return delay * random.uniform(0.5, 1.0)
+
+    def _connect(self):
+        server = smtplib.SMTP(self.host, self.port, timeout=SMTP_TIMEOUT_SECONDS)
+        try:
+            server.starttls()
+            server.login(self.sender_email, self.sender_password)
+        except Exception:
+            server.close()
+            raise
+        with self._lock:
+            self.connections_opened += 1
+        return server
+
+    @staticmethod
+    def _disconnect(server):
+        try:
+            server.quit()
+        except Exception:
+            server.close()
+
+    def _send_batch(self, batch, results):
+        """One worker: a single connection reused for the whole batch, reopened only after a failure."""
+        server = None
+        login_error = None
+        try:
+            for meta in batch:
+                if time.time() - meta["created_at"] > EXPIRE_AFTER_SECONDS:
+                    meta["last_error"] = meta.get("last_error") or "Expired before it could be delivered"
+                    results[meta["id"]] = self._settle(meta, "failed")
+                    continue
+                if login_error is not None:
+                    # Bad credentials fail every message the same way; don't log in again for each
+                    meta["last_error"] = str(login_error)
+                    results[meta["id"]] = self._settle(meta, "failed")
+                    continue
+                try:
+                    with open(self._path(meta["id"], "eml"), "rb") as f:
+                        raw = f.read()
+                except OSError as e:
+                    # A missing or unreadable message fails on its own; the rest of the batch still goes
+                    meta["attempts"] += 1
+                    meta["last_error"] = f"Could not read message: {e}"
+                    results[meta["id"]] = self._settle(meta, "failed")
+                    continue
+
+                for attempt in range(1, self.max_attempts + 1):
+                    try:
+                        if server is None:
+                            server = self._connect()
+                        refused = server.sendmail(meta["sender"], meta["recipients"], raw)
+                    except Exception as e:
+                        meta["attempts"] += 1
+                        meta["last_error"] = str(e)
+                        if server is not None:
+                            self._disconnect(server)
+                            server = None
+                        if isinstance(e, smtplib.SMTPAuthenticationError):
+                            login_error = e
+                        if not _is_transient(e):
+                            results[meta["id"]] = self._settle(meta, "failed")
+                            break
+                        if attempt == self.max_attempts:
+                            results[meta["id"]] = self._settle(meta, "deferred")
+                            break
+                        time.sleep(self._backoff(attempt))
+                        continue
+
+                    meta["attempts"] += 1
+                    # Some recipients refused but the rest accepted the message
+                    meta["last_error"] = f"Refused: {', '.join(refused)}" if refused else None
+                    results[meta["id"]] = self._settle(meta, "sent")
+                    break
+        finally:
+            if server is not None:
+                self._disconnect(server)
+
+    def deliver(self, ids=None):
+        """
+        Sends this sender's pending messages (only `ids` if given) and returns their results.
+        Up to `workers` connections run in parallel, one per MESSAGES_PER_WORKER messages.
+        """
+        claimed = self._claim(set(ids) if ids is not None else None)
+        results = {}
+        if not claimed:
+            return results
+
+        workers = min(self.workers, -(-len(claimed) // MESSAGES_PER_WORKER))
+        batches = [claimed[i::workers] for i in range(workers)]
+        if workers == 1:
+            self._send_batch(batches[0], results)
+        else:
+            threads = [threading.Thread(target=self._send_batch, args=(batch, results), name=f"outbox-{i}")
+                       for i, batch in enumerate(batches)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        return results
+
+    def send(self, recipients, subject, body, html=False, attachments=()):
+        """Enqueues and delivers one message; returns its result. Other pending messages wait for deliver()."""
+        message_id = self.enqueue(recipients, subject, body, html=html, attachments=attachments)
+        results = self.deliver(ids=[message_id])
+        return results.get(message_id, {"status": "deferred", "error": "Claimed by another delivery", "attempts": 0})
+
+
+def main():
+    with open("config.json", "r") as f:
+        config = json.load(f)
+    outbox = Outbox.from_config(config)
+    results = outbox.deliver()
+    for message_id, result in results.items():
+        print(f"{message_id}: {result['status']}" + (f" ({result['error']})" if result["error"] else ""))
+    print(f"{len(results)} messages processed over {outbox.connections_opened} connections.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+"""
+Local stand-in for the Agentcis API, for benchmarking without touching production.
+
+Serves POST /api/v2/clients/list, GET /api/v2/clients/{id} and GET /api/v2/applications
+with synthetic payloads shaped like the dump_*.json samples, plus configurable latency,
+error rate and 429 throttling.
+
+    python mock_agentcis_server.py --clients 8000 --latency-ms 40 --max-inflight 60
+"""
+import argparse
+import asyncio
+import copy
+import json
+import math
+import os
+import random
+import threading
+
+from aiohttp import web
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+VISA_TYPES = ["SC 500", "SC 485", "SC 482", "SC 190", "SC 600", None]
+WORKFLOWS = ["Australian Education", "Migration Service", "Skills Assessment", "State Government Nomination"]
+OWNERS = ["Onshore Support", "Reception Australia Admission", "Info Migration", "Nepal Office"]
+STATUSES = ["In Progress", "Completed", "Discontinued"]
+
+
+def _load_template(filename, pick):
+    path = os.path.join(HERE, filename)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        return pick(json.load(f))
+
+
+class MockAgentcisServer:
+    def __init__(self, clients=1000, applications=None, latency_ms=20.0, jitter_ms=5.0, error_rate=0.0,
+                 throttle_rate=0.0, max_inflight=None, max_per_page=100, expansion_param=None,
+                 host="127.0.0.1", port=0, seed=42):
+        self.clients = clients
+        self.applications = applications if applications is not None else clients * 3
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.max_inflight = max_inflight
+        self.max_per_page = max_per_page
+        self.expansion_param = expansion_param
+        self.host = host
+        self.port = port
+        self.seed = seed
+        self.stats = {"requests": 0, "throttled": 0, "errors": 0}
+
+        self._random = random.Random(seed)
+        self._inflight = 0
+        self._loop = None
+        self._runner = None
+        self._thread = None
+        self._ready = threading.Event()
+
+        self._list_row = _load_template("dump_api_v2_clients_list.json", lambda d: d["data"][0])
+        self._detail = _load_template("dump_api_v2_clients_613.json", lambda d: d["data"])
+        self._application = _load_template("dump_api_v2_applications.json", lambda d: d["data"][0])
+
+    # --- Synthetic payloads -------------------------------------------------
+
+    def _client_fields(self, client_id):
+        rng = random.Random(self.seed * 1_000_003 + client_id)
+        days = rng.randint(-400, 900)
+        expiry = f"{2026 + days // 365:04d}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T00:00:00+00:00"
+        return {
+            "name": f"Client {client_id}",
+            "email": f"client{client_id}@example.com",
+            "phone": f"+614{rng.randint(10000000, 99999999)}",
+            "visa_type": rng.choice(VISA_TYPES),
+            "visa_expiry": expiry,
+            "updated_at": f"2026-01-{rng.randint(1, 28):02d}T10:00:00+10:30",
+        }
+
+    def _list_payload(self, client_id, expand_keys):
+        fields = self._client_fields(client_id)
+        row = copy.deepcopy(self._list_row)
+        row.update({
+            "id": client_id,
+            "internal_id": str(client_id),
+            "full_name": fields["name"],
+            "email": fields["email"],
+            "phone": fields["phone"],
+            "updated_at": {"formatted": fields["updated_at"][:10], "actual": fields["updated_at"]},
+        })
+        if "visa_type" in expand_keys:
+            row["visa_type"] = fields["visa_type"]
+        if "visa_expiry_date" in expand_keys:
+            row["visa_expiry_date"] = {"formatted": fields["visa_expiry"][:10], "actual": fields["visa_expiry"]}
+        return row
+
+    def _detail_payload(self, client_id):
+        fields = self._client_fields(client_id)
+        data = copy.deepcopy(self._detail)
+        data.update({
+            "id": client_id,
+            "internal_id": str(client_id),
+            "full_name": fields["name"],
+            "visa_type": fields["visa_type"],
+            "visa_expiry_date": {"formatted": fields["visa_expiry"][:10], "actual": fields["visa_expiry"]},
+            "email": {"primary": fields["email"], "secondary": None},
+            "phone": {"actual": fields["phone"][3:], "formatted": fields["phone"],
+                      "country_dialing_code": 61, "country_code": "AU"},
+            "updated_at": {"formatted": fields["updated_at"][:10], "actual": fields["updated_at"]},
+        })
+        return {"data": data}
+
+    def _application_payload(self, application_id):
+        rng = random.Random(self.seed * 7_000_003 + application_id)
+        client_id = rng.randint(1, max(self.clients, 1))
+        fields = self._client_fields(client_id)
+        row = copy.deepcopy(self._application)
+        row.update({
+            "id": application_id,
+            "status": rng.choice(STATUSES),
+            "application_owner": rng.choice(OWNERS),
+            "workflow": {"id": 1, "name": rng.choice(WORKFLOWS), "product_name": None, "vendor_name": None},
+            "client": {"id": client_id, "phone": fields["phone"], "status": "Client",
+                       "name": fields["name"], "email": fields["email"]},
+        })
+        return row
+
+    @staticmethod
+    def _meta(page, per_page, total):
+        return {
+            "current_page": page,
+            "from": (page - 1) * per_page + 1,
+            "last_page": max(math.ceil(total / per_page), 1),
+            "per_page": per_page,
+            "to": min(page * per_page, total),
+            "total": total,
+        }
+
+    # --- Request handling ---------------------------------------------------
+
+    @web.middleware
+    async def _behaviour(self, request, handler):
+        """Applies throttling, injected errors and latency around every endpoint."""
+        self.stats["requests"] += 1
+        if (self.max_inflight and self._inflight >= self.max_inflight) or self._random.random() < self.throttle_rate:
+            self.stats["throttled"] += 1
+            return web.json_response({"message": "Too Many Attempts."}, status=429, headers={"Retry-After": "1"})
+        if self._random.random() < self.error_rate:
+            self.stats["errors"] += 1
+            return web.json_response({"message": "Server Error"}, status=503)
+
+        self._inflight += 1
+        try:
+            delay = max(self._random.gauss(self.latency_ms, self.jitter_ms), 0) / 1000
+            await asyncio.sleep(delay)
+            return await handler(request)
+        finally:
+            self._inflight -= 1
+
+    async def _clients_list(self, request):
+        body = await request.json() if request.can_read_body else {}
+        page = int(body.get("page", 1))
+        per_page = min(int(body.get("limit", 10)), self.max_per_page)
+        expand_keys = body.get(self.expansion_param) or [] if self.expansion_param else []
+        first = (page - 1) * per_page + 1
+        ids = range(first, min(first + per_page, self.clients + 1))
+        return web.json_response({
+            "data": [self._list_payload(i, expand_keys) for i in ids],
+            "meta": self._meta(page, per_page, self.clients),
+        })
+
+    async def _client_detail(self, request):
+        client_id = int(request.match_info["client_id"])
+        if not 1 <= client_id <= self.clients:
+            return web.json_response({"message": "Not Found"}, status=404)
+        return web.json_response(self._detail_payload(client_id))
+
+    async def _applications(self, request):
+        page = int(request.query.get("page", 1))
+        per_page = min(int(request.query.get("per_page", 10)), self.max_per_page)
+        first = (page - 1) * per_page + 1
+        ids = range(first, min(first + per_page, self.applications + 1))
+        return web.json_response({
+            "data": [self._application_payload(i) for i in ids],
+            "meta": self._meta(page, per_page, self.applications),
+        })
+
+    def make_app(self):
+        app = web.Application(middlewares=[self._behaviour])
+        app.router.add_post("/api/v2/clients/list", self._clients_list)
+        app.router.add_get(r"/api/v2/clients/{client_id:\d+}", self._client_detail)
+        app.router.add_get("/api/v2/applications", self._applications)
+        return app
+
+    # --- Lifecycle ----------------------------------------------------------
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}"
+
+    def start(self):
+        """Starts the server on a background thread and returns its base URL."""
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        return self.base_url
+
+    def _serve(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._runner = web.AppRunner(self.make_app(), access_log=None)
+        self._loop.run_until_complete(self._runner.setup())
+        site = web.TCPSite(self._runner, self.host, self.port)
+        self._loop.run_until_complete(site.start())
+        self.port = self._runner.addresses[0][1]
+        self._ready.set()
+        self._loop.run_forever()
+        self._loop.run_until_complete(self._runner.cleanup())
+        self._loop.close()
+
+    def stop(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local mock of the Agentcis API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--applications", type=int, default=None)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--jitter-ms", type=float, default=5.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 503")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--max-inflight", type=int, default=None, help="Answer 429 above this many concurrent requests")
+    parser.add_argument("--max-per-page", type=int, default=100)
+    parser.add_argument("--expansion-param", default=None, help="List param that expands detail fields, e.g. 'with'")
+    args = parser.parse_args()
+
+    server = MockAgentcisServer(
+        clients=args.clients, applications=args.applications, latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms, error_rate=args.error_rate, throttle_rate=args.throttle_rate,
+        max_inflight=args.max_inflight, max_per_page=args.max_per_page,
+        expansion_param=args.expansion_param, host=args.host, port=args.port,
+    )
+    print(f"Mock Agentcis API on http://{args.host}:{args.port} ({args.clients} clients). Ctrl+C to stop.")
+    web.run_app(server.make_app(), host=args.host, port=args.port, print=None, access_log=None)
+
+
+if __name__ == "__main__":
+    main()
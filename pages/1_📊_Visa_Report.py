@@ -2,6 +2,9 @@ import streamlit as st
 import pandas as pd
 from datetime import datetime, timedelta
 import io
+from mail_outbox import Outbox
+from artifact_cache import cached_workbook_bytes
+from expiry_index import ExpiryIndex
 
 # 1. PAGE SETUP
 st.set_page_config(page_title="Visa Report Automator", page_icon="✈️")
@@ -29,18 +32,18 @@ if uploaded_file is not None:
         today = datetime.now()
         three_months_out = today + timedelta(days=90)
         
+        # Sort once by expiry; each window below is a binary search
+        index = ExpiryIndex(df, 'Visa Expiry Date', type_column='Visa Type')
+        
         # Filter 1: < 3 Months (Future expiries only)
         # We ensure we don't pick up old expired visas (must be > today)
-        mask_time = (df['Visa Expiry Date'] >= today) & (df['Visa Expiry Date'] <= three_months_out)
-        df_all = df[mask_time].copy()
+        df_all = index.between(today, three_months_out)
         
         # Filter 2: SC 500
-        mask_500 = df_all['Visa Type'].astype(str).str.contains("500", na=False)
-        df_500 = df_all[mask_500]
+        df_500 = index.between(today, three_months_out, subclass="500")
         
         # Filter 3: SC 485
-        mask_485 = df_all['Visa Type'].astype(str).str.contains("485", na=False)
-        df_485 = df_all[mask_485]
+        df_485 = index.between(today, three_months_out, subclass="485")
         
         # Show quick stats
         col1, col2, col3 = st.columns(3)
@@ -48,12 +51,17 @@ if uploaded_file is not None:
         col2.metric("SC 500", len(df_500))
         col3.metric("SC 485", len(df_485))
 
+        # Expiries within 30/60/90/180 days per subclass, from the same index
+        buckets = index.buckets(today).rename_axis('Visa Subclass').reset_index()
+        st.dataframe(buckets, use_container_width=True, hide_index=True)
+
         # 4. SAVE TO EXCEL (IN MEMORY)
-        buffer = io.BytesIO()
-        with pd.ExcelWriter(buffer, engine='xlsxwriter') as writer:
-            df_all.to_excel(writer, sheet_name='All < 3 Months', index=False)
-            df_500.to_excel(writer, sheet_name='SC 500 < 3 Months', index=False)
-            df_485.to_excel(writer, sheet_name='SC 485 < 3 Months', index=False)
+        buffer = io.BytesIO(cached_workbook_bytes({
+            'All < 3 Months': df_all,
+            'SC 500 < 3 Months': df_500,
+            'SC 485 < 3 Months': df_485,
+            'Expiry Buckets': buckets,
+        }))
             
         # 5. DOWNLOAD BUTTON
         st.download_button(
@@ -137,40 +145,15 @@ Ashish Shrestha"""
                 st.error("Please provide Sender Email and App Password in the sidebar.")
             else:
                 try:
-                    import smtplib
-                    from email.mime.multipart import MIMEMultipart
-                    from email.mime.text import MIMEText
-                    from email.mime.base import MIMEBase
-                    from email import encoders
-
-                    # Setup the MIME
-                    msg = MIMEMultipart()
-                    msg['From'] = sender_email
-                    msg['To'] = recipients
-                    msg['Subject'] = email_subject
-
-                    msg.attach(MIMEText(email_body, 'plain'))
-
-                    # Attachment
-                    part = MIMEBase('application', 'octet-stream')
-                    part.set_payload(buffer.getvalue())
-                    encoders.encode_base64(part)
-                    part.add_header('Content-Disposition', f"attachment; filename= Weekly_Report_{datetime.now().date()}.xlsx")
-                    msg.attach(part)
-
-                    # SMTP Session
-                    # Assuming Gmail for now, but could be configurable
-                    server = smtplib.SMTP('smtp.gmail.com', 587)
-                    server.starttls()
-                    server.login(sender_email, sender_password)
-                    text = msg.as_string()
-                    
-                    # Handle multiple recipients
-                    recipient_list = [r.strip() for r in recipients.split(',')]
-                    server.sendmail(sender_email, recipient_list, text)
-                    server.quit()
-
-                    st.success(f"Email sent successfully to: {recipients}!")
+                    outbox = Outbox(sender_email, sender_password)
+                    result = outbox.send(
+                        recipients, email_subject, email_body,
+                        attachments=[(f"Weekly_Report_{datetime.now().date()}.xlsx", buffer.getvalue())],
+                    )
+                    if result["status"] == "sent":
+                        st.success(f"Email sent successfully to: {recipients}!")
+                    else:
+                        st.error(f"Failed to send email. Error: {result['error']}")
                     
                 except Exception as e:
                     st.error(f"Failed to send email. Error: {e}")
@@ -2,6 +2,10 @@ import streamlit as st
 import pandas as pd
 from datetime import datetime
 import io
+from agentcis_client import APPLICATION_COLUMNS
+from app_automated import load_config, build_lead_summary, fetch_dataset
+from prefetch_service import load_dataset
+from artifact_cache import cached_workbook_bytes
 
 # 1. PAGE SETUP
 st.set_page_config(page_title="Lead Report Automator", page_icon="🎯", layout="wide")
@@ -30,56 +34,9 @@ def load_data(file):
 
 def process_application_report(df):
     try:
-        # Standardize columns
+        # Standardize columns (in place: the filters below read the same frame)
         df.columns = df.columns.str.strip()
-        
-        # Check required columns
-        required_cols = ['Status', 'Workflow Name', 'Application Owner', 'Internal Client ID']
-        missing_cols = [col for col in required_cols if col not in df.columns]
-        if missing_cols:
-            st.error(f"Missing columns: {', '.join(missing_cols)}")
-            return None
-
-        # Filter: Status == "In Progress"
-        df_filtered = df[df['Status'] == 'In Progress'].copy()
-        
-        # Categorize Application Type
-        def get_app_type(workflow_name):
-            if pd.isna(workflow_name):
-                return "Admission"
-            name_lower = str(workflow_name).lower()
-            if any(x in name_lower for x in ["migration service", "skills assessment", "state government"]):
-                return "Migration"
-            return "Admission"
-
-        df_filtered['App_Type'] = df_filtered['Workflow Name'].apply(get_app_type)
-
-        # Aggregation
-        # 1. Distinct Count of Internal Client ID
-        # 2. Count of Internal Client ID (Total Applications)
-        # 3. Count of Migration Apps
-        # 4. Count of Admission Apps
-        
-        summary = df_filtered.groupby('Application Owner').agg(
-            Distinct_Clients=('Internal Client ID', 'nunique'),
-            Total_Applications=('Internal Client ID', 'count'),
-            Migration_Count=('App_Type', lambda x: (x == 'Migration').sum()),
-            Admission_Count=('App_Type', lambda x: (x == 'Admission').sum())
-        ).reset_index()
-        
-        # Add Grand Total Row
-        total_row = pd.DataFrame({
-            'Application Owner': ['Grand Total'],
-            'Distinct_Clients': [df_filtered['Internal Client ID'].nunique()],
-            'Total_Applications': [len(df_filtered)],
-            'Migration_Count': [(df_filtered['App_Type'] == 'Migration').sum()],
-            'Admission_Count': [(df_filtered['App_Type'] == 'Admission').sum()]
-        })
-        
-        summary = pd.concat([summary, total_row], ignore_index=True)
-        
-        return summary
-
+        return build_lead_summary(df)
     except Exception as e:
         st.error(f"Error processing report: {e}")
         return None
@@ -92,6 +49,22 @@ with col1:
 with col2:
     uploaded_client_file = st.file_uploader("Upload Client Report Data", type=['xlsx', 'xls', 'csv'])
 
+# Or pull the application report straight from the Agentcis API
+with st.expander("🔄 Fetch Application Report from Agentcis"):
+    st.write("Skip the manual export: pull every application from Agentcis (uploaded files take priority).")
+    if st.button("Fetch Applications", key="fetch_agentcis_applications"):
+        fetch_status = st.empty()
+        try:
+            with st.spinner("Fetching applications from Agentcis..."):
+                # Shared with the report pipeline: multi-tenant aware, and joins a fetch already running
+                st.session_state["agentcis_applications"] = fetch_dataset(
+                    load_config(), "applications", APPLICATION_COLUMNS, progress_callback=fetch_status.text
+                )
+                st.session_state["agentcis_applications_at"] = datetime.now()
+            fetch_status.empty()
+        except Exception as e:
+            st.error(f"Error fetching applications from Agentcis: {e}")
+
 df_leads = None
 df_client = None
 
@@ -101,6 +74,16 @@ if uploaded_file is not None:
         st.success(f"✅ Lead Data: {len(df_leads)} rows")
     except Exception as e:
         st.error(f"Error loading Lead Data: {e}")
+elif "agentcis_applications" in st.session_state:
+    df_leads = st.session_state["agentcis_applications"].copy()
+    fetched_at = st.session_state["agentcis_applications_at"].strftime("%d %b %Y %H:%M")
+    st.success(f"✅ Lead Data: {len(df_leads)} rows fetched from Agentcis at {fetched_at}")
+else:
+    # Warm snapshot kept by the prefetch service, if one is fresh
+    prefetched = load_dataset(load_config(), "applications")
+    if prefetched is not None:
+        df_leads, refreshed_at = prefetched
+        st.success(f"✅ Lead Data: {len(df_leads)} rows prefetched from Agentcis at {refreshed_at:%d %b %Y %H:%M}")
 
 if uploaded_client_file is not None:
     try:
@@ -119,9 +102,7 @@ if df_leads is not None:
         st.dataframe(summary_df, use_container_width=True)
         
         # Download Button
-        buffer = io.BytesIO()
-        with pd.ExcelWriter(buffer, engine='xlsxwriter') as writer:
-            summary_df.to_excel(writer, sheet_name='Summary', index=False)
+        buffer = io.BytesIO(cached_workbook_bytes({'Summary': summary_df}))
             
         st.download_button(
             label="💾 Download Summary Excel",
@@ -203,9 +184,7 @@ if df_leads is not None:
         st.dataframe(summary_completed, use_container_width=True)
         
         # Download
-        buffer_comp = io.BytesIO()
-        with pd.ExcelWriter(buffer_comp, engine='xlsxwriter') as writer:
-            summary_completed.to_excel(writer, sheet_name='Completed Apps', index=False)
+        buffer_comp = io.BytesIO(cached_workbook_bytes({'Completed Apps': summary_completed}))
             
         st.download_button(
             label=f"💾 Download {selected_status} Report",
@@ -7,6 +7,8 @@ import os
 import matplotlib.pyplot as plt
 import base64
 from io import BytesIO
+from mail_outbox import Outbox
+from artifact_cache import cached_workbook_bytes
 
 # Page configuration
 st.set_page_config(page_title="IELTS/PTE Report", page_icon="📚", layout="wide")
@@ -457,33 +459,33 @@ with st.spinner("Fetching data from Google Sheets..."):
         # Generate Excel Report
         st.header("📥 Download & Email Report")
         
-        buffer = io.BytesIO()
-        with pd.ExcelWriter(buffer, engine='xlsxwriter') as writer:
-            # Sheet 1: Summary
-            summary_data = {
-                'Metric': ['Total Revenue', 'Student Revenue', 'Book Revenue', 'Outstanding Balance', 'Total Students'],
-                'Value': [total_revenue, total_student_revenue, total_book_revenue, total_outstanding, total_students]
-            }
-            pd.DataFrame(summary_data).to_excel(writer, sheet_name='Summary', index=False)
-            
-            # Sheet 2: Outstanding
-            if not outstanding.empty:
-                outstanding_display.to_excel(writer, sheet_name='Outstanding Payments', index=False)
-            
-            # Sheet 3: Fully Paid
-            if not fully_paid.empty:
-                fully_paid_display.to_excel(writer, sheet_name='Fully Paid', index=False)
-            
-            # Sheet 4: All Students
-            if not df_students.empty:
-                all_students.to_excel(writer, sheet_name='All Students', index=False)
-            
-            # Sheet 5: Revenue Summary
-            monthly_revenue.to_excel(writer, sheet_name='Monthly Revenue', index=False)
-            office_breakdown.to_excel(writer, sheet_name='Office Revenue', index=False)
-            
-            # Sheet 6: Expenses
-            df_expenses_filtered.to_excel(writer, sheet_name='Expenses', index=False)
+        # Sheet 1: Summary
+        summary_data = {
+            'Metric': ['Total Revenue', 'Student Revenue', 'Book Revenue', 'Outstanding Balance', 'Total Students'],
+            'Value': [total_revenue, total_student_revenue, total_book_revenue, total_outstanding, total_students]
+        }
+        sheets = {'Summary': pd.DataFrame(summary_data)}
+        
+        # Sheet 2: Outstanding
+        if not outstanding.empty:
+            sheets['Outstanding Payments'] = outstanding_display
+        
+        # Sheet 3: Fully Paid
+        if not fully_paid.empty:
+            sheets['Fully Paid'] = fully_paid_display
+        
+        # Sheet 4: All Students
+        if not df_students.empty:
+            sheets['All Students'] = all_students
+        
+        # Sheet 5: Revenue Summary
+        sheets['Monthly Revenue'] = monthly_revenue
+        sheets['Office Revenue'] = office_breakdown
+        
+        # Sheet 6: Expenses
+        sheets['Expenses'] = df_expenses_filtered
+        
+        buffer = io.BytesIO(cached_workbook_bytes(sheets))
         
         st.download_button(
             label="📥 Download Excel Report",
@@ -653,38 +655,15 @@ with st.spinner("Fetching data from Google Sheets..."):
                 st.error("Please configure email settings in the sidebar")
             else:
                 try:
-                    import smtplib
-                    from email.mime.multipart import MIMEMultipart
-                    from email.mime.text import MIMEText
-                    from email.mime.base import MIMEBase
-                    from email import encoders
-                    
-                    # Setup MIME
-                    msg = MIMEMultipart('alternative')
-                    msg['From'] = sender_email
-                    msg['To'] = recipients
-                    msg['Subject'] = email_subject
-                    
-                    # Attach HTML body
-                    msg.attach(MIMEText(html_body, 'html'))
-                    
-                    # Attach Excel file
-                    part = MIMEBase('application', 'octet-stream')
-                    part.set_payload(buffer.getvalue())
-                    encoders.encode_base64(part)
-                    part.add_header('Content-Disposition', f"attachment; filename= IELTS_PTE_Report_{datetime.now().date()}.xlsx")
-                    msg.attach(part)
-                    
-                    # Send email
-                    server = smtplib.SMTP('smtp.gmail.com', 587)
-                    server.starttls()
-                    server.login(sender_email, sender_password)
-                    
-                    recipient_list = [r.strip() for r in recipients.split(',')]
-                    server.sendmail(sender_email, recipient_list, msg.as_string())
-                    server.quit()
-                    
-                    st.success(f"✅ Email sent successfully to: {recipients}!")
+                    outbox = Outbox(sender_email, sender_password)
+                    result = outbox.send(
+                        recipients, email_subject, html_body, html=True,
+                        attachments=[(f"IELTS_PTE_Report_{datetime.now().date()}.xlsx", buffer.getvalue())],
+                    )
+                    if result["status"] == "sent":
+                        st.success(f"✅ Email sent successfully to: {recipients}!")
+                    else:
+                        st.error(f"Failed to send email. Error: {result['error']}")
                     
                 except Exception as e:
                     st.error(f"Failed to send email. Error: {e}")
@@ -2,6 +2,9 @@ import streamlit as st
 import pandas as pd
 from datetime import datetime, timedelta
 import io
+from mail_outbox import Outbox
+from artifact_cache import cached_workbook_bytes
+from expiry_index import ExpiryIndex
 import json
 import os
 
@@ -62,13 +65,15 @@ if uploaded_file is not None:
             eighteen_months_ago = today - timedelta(days=18*30)  # Approx 18 months
             six_months_future = today + timedelta(days=6*30)  # Approx 6 months
             
+            # Each date column is sorted once; the windows are binary searches over it
+            received_index = ExpiryIndex(df, date_coe_col, dates=df[date_coe_col])
+            end_index = ExpiryIndex(df, coe_end_col, dates=df[coe_end_col])
+            
             # Sheet 1: COE received in past 18 months
-            mask_18_months = (df[date_coe_col] >= eighteen_months_ago) & (df[date_coe_col] <= today)
-            df_18_months = df[mask_18_months].copy()
+            df_18_months = received_index.between(eighteen_months_ago, today)
             
             # Sheet 2: COE expiry < 6 months
-            mask_expiring = (df[coe_end_col] >= today) & (df[coe_end_col] <= six_months_future)
-            df_expiring = df[mask_expiring].copy()
+            df_expiring = end_index.between(today, six_months_future)
             
             # Select columns A to W (0-indexed: 0 to 22)
             cols_a_to_w = df.columns[0:23].tolist()
@@ -80,6 +85,9 @@ if uploaded_file is not None:
             col1.metric("COE Received (Past 18 Months)", len(df_18_months_filtered))
             col2.metric("COE Expiring (< 6 Months)", len(df_expiring_filtered))
             
+            # COE end dates within 30/60/90/180 days, from the same index
+            st.dataframe(end_index.buckets(today).rename(index={"All": "COE End Date"}), use_container_width=True)
+            
             # Display data
             tab1, tab2 = st.tabs(["COE Received (18M)", "COE Expiring (6M)"])
             
@@ -98,10 +106,10 @@ if uploaded_file is not None:
                     st.info("No records found.")
             
             # Download button for Report 1
-            buffer1 = io.BytesIO()
-            with pd.ExcelWriter(buffer1, engine='xlsxwriter') as writer:
-                df_18_months_filtered.to_excel(writer, sheet_name='COE Received 18M', index=False)
-                df_expiring_filtered.to_excel(writer, sheet_name='COE Expiring 6M', index=False)
+            buffer1 = io.BytesIO(cached_workbook_bytes({
+                'COE Received 18M': df_18_months_filtered,
+                'COE Expiring 6M': df_expiring_filtered,
+            }))
             
             st.download_button(
                 label="📥 Download COE Expiry Report",
@@ -158,34 +166,15 @@ Ashish Shrestha"""
                     st.error("Please configure email settings in the sidebar")
                 else:
                     try:
-                        import smtplib
-                        from email.mime.multipart import MIMEMultipart
-                        from email.mime.text import MIMEText
-                        from email.mime.base import MIMEBase
-                        from email import encoders
-
-                        msg = MIMEMultipart()
-                        msg['From'] = sender_email
-                        msg['To'] = recipients_expiry
-                        msg['Subject'] = email_subject_expiry
-
-                        msg.attach(MIMEText(email_body_expiry, 'plain'))
-
-                        part = MIMEBase('application', 'octet-stream')
-                        part.set_payload(buffer1.getvalue())
-                        encoders.encode_base64(part)
-                        part.add_header('Content-Disposition', f"attachment; filename=COE_Expiry_Report_{datetime.now().date()}.xlsx")
-                        msg.attach(part)
-
-                        server = smtplib.SMTP('smtp.gmail.com', 587)
-                        server.starttls()
-                        server.login(sender_email, sender_password)
-                        
-                        recipient_list = [r.strip() for r in recipients_expiry.split(',')]
-                        server.sendmail(sender_email, recipient_list, msg.as_string())
-                        server.quit()
-
-                        st.success(f"Email sent successfully to: {recipients_expiry}!")
+                        outbox = Outbox(sender_email, sender_password)
+                        result = outbox.send(
+                            recipients_expiry, email_subject_expiry, email_body_expiry,
+                            attachments=[(f"COE_Expiry_Report_{datetime.now().date()}.xlsx", buffer1.getvalue())],
+                        )
+                        if result["status"] == "sent":
+                            st.success(f"Email sent successfully to: {recipients_expiry}!")
+                        else:
+                            st.error(f"Failed to send email. Error: {result['error']}")
                     except Exception as e:
                         st.error(f"Failed to send email. Error: {e}")
             
@@ -323,10 +312,10 @@ Ashish Shrestha"""
                 
                 
                 # Download button for Report 2
-                buffer2 = io.BytesIO()
-                with pd.ExcelWriter(buffer2, engine='xlsxwriter') as writer:
-                    display_table.to_excel(writer, sheet_name='Current Month Sales', index=False)
-                    df_current_month.to_excel(writer, sheet_name='Raw Data', index=False)
+                buffer2 = io.BytesIO(cached_workbook_bytes({
+                    'Current Month Sales': display_table,
+                    'Raw Data': df_current_month,
+                }))
                 
                 st.download_button(
                     label="📥 Download Current Month Sales Report",
@@ -408,34 +397,15 @@ tr:nth-child(even) {{background-color: #f9f9f9;}}
                         st.error("Please configure email settings in the sidebar")
                     else:
                         try:
-                            import smtplib
-                            from email.mime.multipart import MIMEMultipart
-                            from email.mime.text import MIMEText
-                            from email.mime.base import MIMEBase
-                            from email import encoders
-
-                            msg = MIMEMultipart('alternative')
-                            msg['From'] = sender_email
-                            msg['To'] = recipients_sales
-                            msg['Subject'] = email_subject_sales
-
-                            msg.attach(MIMEText(html_body_sales, 'html'))
-
-                            part = MIMEBase('application', 'octet-stream')
-                            part.set_payload(buffer2.getvalue())
-                            encoders.encode_base64(part)
-                            part.add_header('Content-Disposition', f"attachment; filename=COE_Sales_{selected_month_date.strftime('%B_%Y')}.xlsx")
-                            msg.attach(part)
-
-                            server = smtplib.SMTP('smtp.gmail.com', 587)
-                            server.starttls()
-                            server.login(sender_email, sender_password)
-                            
-                            recipient_list = [r.strip() for r in recipients_sales.split(',')]
-                            server.sendmail(sender_email, recipient_list, msg.as_string())
-                            server.quit()
-
-                            st.success(f"Email sent successfully to: {recipients_sales}!")
+                            outbox = Outbox(sender_email, sender_password)
+                            result = outbox.send(
+                                recipients_sales, email_subject_sales, html_body_sales, html=True,
+                                attachments=[(f"COE_Sales_{selected_month_date.strftime('%B_%Y')}.xlsx", buffer2.getvalue())],
+                            )
+                            if result["status"] == "sent":
+                                st.success(f"Email sent successfully to: {recipients_sales}!")
+                            else:
+                                st.error(f"Failed to send email. Error: {result['error']}")
                         except Exception as e:
                             st.error(f"Failed to send email. Error: {e}")
                 
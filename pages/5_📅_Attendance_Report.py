@@ -3,12 +3,10 @@ import pandas as pd
 import json
 import streamlit.components.v1 as components
 from datetime import time
-import smtplib
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
 import os
 import io
 import xlsxwriter
+from mail_outbox import Outbox
 
 
 # PAGE SETUP
@@ -115,20 +113,12 @@ def generate_excel_report(df_daily):
 
 def send_email_simple(sender, password, recipient, subject, html_body):
     try:
-        msg = MIMEMultipart()
-        msg['From'] = sender
-        msg['To'] = recipient
-        msg['Subject'] = subject
-        msg.attach(MIMEText(html_body, 'html'))
-        
-        server = smtplib.SMTP('smtp.gmail.com', 587)
-        server.starttls()
-        server.login(sender, password)
-        server.sendmail(sender, recipient, msg.as_string())
-        server.quit()
-        return True, "Sent"
+        result = Outbox(sender, password).send(recipient, subject, html_body, html=True)
     except Exception as e:
         return False, str(e)
+    if result["status"] != "sent":
+        return False, result["error"]
+    return True, "Sent"
 
 def process_attendance_simple(df):
     df.columns = df.columns.str.strip()
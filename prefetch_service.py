@@ -0,0 +1,214 @@
+"""
+Background prefetch of Agentcis data, so reports read warm local snapshots instead of
+paying for a full fetch when someone clicks.
+
+Runs inside the control panel (prefetch_enabled in config.json) or standalone:
+
+    python prefetch_service.py            # refresh every prefetch_interval_minutes
+    python prefetch_service.py --once     # refresh once and exit
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from agentcis_client import AgentcisClient
+from agentcis_store import DEFAULT_STORE_PATH
+from agentcis_tenants import MultiTenantClient, tenant_configs
+
+DATASETS = ("visa", "applications")
+DEFAULT_PREFETCH_DIR = "prefetch"
+DEFAULT_INTERVAL_MINUTES = 60
+# Snapshots older than this are ignored by readers (they fall back to a live fetch)
+DEFAULT_MAX_AGE_MINUTES = 180
+STATUS_FILE = "status.json"
+
+_status_lock = threading.Lock()
+
+
+def _directory(config):
+    return config.get("prefetch_dir", DEFAULT_PREFETCH_DIR)
+
+
+def _source_key(config):
+    """Which tenants a snapshot was built from; a snapshot of other tenants is never served."""
+    return [[name, tenant_config["agentcis_base_url"]] for name, tenant_config in tenant_configs(config)]
+
+
+def read_status(config):
+    path = os.path.join(_directory(config), STATUS_FILE)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _temp_path(path):
+    # The dashboard and the service process can refresh at once: each writer gets its own temp file
+    return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+
+def _write_status(config, dataset, entry):
+    directory = _directory(config)
+    with _status_lock:
+        status = read_status(config)
+        status[dataset] = {**status.get(dataset, {}), **entry}
+        path = os.path.join(directory, STATUS_FILE)
+        tmp_path = _temp_path(path)
+        with open(tmp_path, "w") as f:
+            json.dump(status, f, indent=4)
+        os.replace(tmp_path, path)
+
+
+def dataset_freshness(config):
+    """
+    Freshness of every dataset: {name: {refreshed_at, age_minutes, rows, duration_seconds,
+    error, fresh}}. `fresh` means the snapshot exists, matches the configured tenants and is
+    younger than prefetch_max_age_minutes.
+    """
+    status = read_status(config)
+    max_age = config.get("prefetch_max_age_minutes", DEFAULT_MAX_AGE_MINUTES)
+    freshness = {}
+    for dataset in DATASETS:
+        entry = status.get(dataset, {})
+        refreshed_at = entry.get("refreshed_at")
+        age = (time.time() - refreshed_at) / 60 if refreshed_at else None
+        freshness[dataset] = {
+            "refreshed_at": datetime.fromtimestamp(refreshed_at) if refreshed_at else None,
+            "age_minutes": age,
+            "rows": entry.get("rows"),
+            "duration_seconds": entry.get("duration_seconds"),
+            "error": entry.get("error"),
+            "fresh": (
+                age is not None and age <= max_age and entry.get("source") == _source_key(config)
+                and os.path.exists(os.path.join(_directory(config), f"{dataset}.pkl"))
+            ),
+        }
+    return freshness
+
+
+def load_dataset(config, dataset):
+    """Returns (DataFrame, refreshed_at datetime) from a fresh snapshot, or None."""
+    freshness = dataset_freshness(config)[dataset]
+    if not freshness["fresh"]:
+        return None
+    try:
+        return pd.read_pickle(os.path.join(_directory(config), f"{dataset}.pkl")), freshness["refreshed_at"]
+    except Exception:
+        return None
+
+
+class PrefetchService:
+    """
+    Refreshes every dataset in DATASETS on a fixed cadence and writes each one as a
+    snapshot (prefetch/<dataset>.pkl) plus its freshness in prefetch/status.json.
+
+    Visa refreshes are incremental: the client store (agentcis_store_path, on by default
+    here) lets unchanged clients skip their detail call. Applications have no change
+    filter upstream, so they are re-synced whole with the negotiated page size.
+    """
+
+    def __init__(self, config, interval_minutes=None, progress_callback=None):
+        self.config = {
+            **config,
+            "agentcis_store_path": config.get("agentcis_store_path") or DEFAULT_STORE_PATH,
+            # A prefetch is always a complete run; a partial one is simply redone next cycle
+            "agentcis_checkpoint_path": None,
+        }
+        self.interval = 60 * (interval_minutes or config.get("prefetch_interval_minutes", DEFAULT_INTERVAL_MINUTES))
+        self.report = AgentcisClient._reporter(progress_callback)
+        self._stop = threading.Event()
+        self._thread = None
+        os.makedirs(_directory(config), exist_ok=True)
+
+    def _fetch_visa(self):
+        client_cls = MultiTenantClient if self.config.get("agentcis_tenants") else AgentcisClient
+        with client_cls.from_config(self.config) as client:
+            return client.fetch_visa_data(progress_callback=self.report)
+
+    def _fetch_applications(self):
+        client_cls = MultiTenantClient if self.config.get("agentcis_tenants") else AgentcisClient
+        with client_cls.from_config(self.config) as client:
+            return client.fetch_applications(progress_callback=self.report)
+
+    def refresh(self, dataset):
+        """Refreshes one dataset; failures are recorded in the status and the old snapshot kept."""
+        started = time.time()
+        self.report(f"Prefetch: refreshing {dataset}...")
+        try:
+            df = self._fetch_visa() if dataset == "visa" else self._fetch_applications()
+            df.attrs = {}
+            path = os.path.join(_directory(self.config), f"{dataset}.pkl")
+            tmp_path = _temp_path(path)
+            try:
+                df.to_pickle(tmp_path)
+                os.replace(tmp_path, path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+        except Exception as e:
+            self.report(f"Prefetch: {dataset} refresh failed: {e}")
+            _write_status(self.config, dataset, {"error": str(e), "failed_at": time.time()})
+            return False
+
+        duration = time.time() - started
+        _write_status(self.config, dataset, {
+            "refreshed_at": time.time(),
+            "rows": len(df),
+            "duration_seconds": round(duration, 1),
+            "source": _source_key(self.config),
+            "error": None,
+        })
+        self.report(f"Prefetch: {dataset} refreshed ({len(df)} rows in {duration:.0f}s).")
+        return True
+
+    def refresh_all(self):
+        for dataset in DATASETS:
+            if self._stop.is_set():
+                return
+            self.refresh(dataset)
+
+    def run_forever(self):
+        while not self._stop.is_set():
+            self.refresh_all()
+            self._stop.wait(self.interval)
+
+    def start(self):
+        """Runs the refresh loop on a daemon thread (first refresh immediately)."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self.run_forever, name="agentcis-prefetch", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keep local Agentcis snapshots warm")
+    parser.add_argument("--once", action="store_true", help="Refresh every dataset once and exit")
+    parser.add_argument("--interval-minutes", type=float, default=None)
+    args = parser.parse_args()
+
+    with open("config.json", "r") as f:
+        config = json.load(f)
+    service = PrefetchService(config, interval_minutes=args.interval_minutes)
+    if args.once:
+        service.refresh_all()
+    else:
+        try:
+            service.run_forever()
+        except KeyboardInterrupt:
+            service.stop()
+
+
+if __name__ == "__main__":
+    main()
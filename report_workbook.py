@@ -0,0 +1,128 @@
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+import xlsxwriter
+
+DEFAULT_CHUNK_ROWS = 5000
+# The formats pandas' to_excel uses, so reports look the same as before
+DATETIME_FORMAT = "yyyy-mm-dd hh:mm:ss"
+HEADER_FORMAT = {"bold": True, "border": 1, "align": "center", "valign": "top"}
+
+
+def _column_values(series):
+    """One column as Python values for xlsxwriter: missing values become None, datetimes lose their timezone."""
+    if isinstance(series.dtype, pd.DatetimeTZDtype):
+        series = series.dt.tz_localize(None)
+    values = series.tolist()
+    for i in np.flatnonzero(series.isna().to_numpy()):
+        values[i] = None
+    return values
+
+
+def _is_missing(value):
+    return value is None or value is pd.NaT or value is pd.NA or (isinstance(value, float) and value != value)
+
+
+class StreamingWorkbook:
+    """
+    xlsxwriter workbook in constant_memory mode for large report exports.
+
+    Rows are written in DataFrame slices of `chunk_rows` (or straight from an iterator)
+    and flushed to disk as each row completes, so peak memory stays flat however long a
+    sheet is, instead of holding the whole frame plus its XML tree like
+    pd.ExcelWriter/to_excel. The workbook is written to `path`, or to a temporary file
+    that cleanup() (or leaving the with block) removes.
+
+        with StreamingWorkbook() as workbook:
+            workbook.write_frame("All < 3 Months", df_all)
+            data = workbook.read_bytes()
+    """
+
+    def __init__(self, path=None, chunk_rows=DEFAULT_CHUNK_ROWS):
+        self._temporary = path is None
+        if path is None:
+            fd, path = tempfile.mkstemp(suffix=".xlsx", prefix="report_")
+            os.close(fd)
+        self.path = path
+        self.chunk_rows = chunk_rows
+        self.workbook = xlsxwriter.Workbook(path, {
+            "constant_memory": True,
+            "default_date_format": DATETIME_FORMAT,
+        })
+        self._header_format = self.workbook.add_format(HEADER_FORMAT)
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        self.cleanup()
+
+    def _add_sheet(self, sheet_name, columns):
+        worksheet = self.workbook.add_worksheet(sheet_name)
+        worksheet.write_row(0, 0, [str(column) for column in columns], self._header_format)
+        return worksheet
+
+    @staticmethod
+    def _write_row(worksheet, row_number, values):
+        # Blank cells are skipped rather than written, like to_excel does for NaN
+        for column, value in enumerate(values):
+            if value is None:
+                continue
+            try:
+                worksheet.write(row_number, column, value)
+            except TypeError:
+                # No cell type for lists, dicts and other objects: written as their text
+                worksheet.write_string(row_number, column, str(value))
+
+    def write_frame(self, sheet_name, df):
+        """Writes `df` (without its index) as a new sheet, one chunk of rows at a time."""
+        worksheet = self._add_sheet(sheet_name, df.columns)
+        row_number = 1
+        for start in range(0, len(df), self.chunk_rows):
+            chunk = df.iloc[start:start + self.chunk_rows]
+            columns = [_column_values(chunk.iloc[:, i]) for i in range(chunk.shape[1])]
+            for values in zip(*columns):
+                self._write_row(worksheet, row_number, values)
+                row_number += 1
+        return row_number - 1
+
+    def write_rows(self, sheet_name, columns, rows):
+        """Writes an iterable of row sequences as a new sheet without materialising it."""
+        worksheet = self._add_sheet(sheet_name, columns)
+        row_number = 1
+        for values in rows:
+            self._write_row(worksheet, row_number, [None if _is_missing(value) else value for value in values])
+            row_number += 1
+        return row_number - 1
+
+    def close(self):
+        """Finishes the file at self.path and returns the path."""
+        if not self._closed:
+            self._closed = True
+            self.workbook.close()
+        return self.path
+
+    def read_bytes(self):
+        self.close()
+        with open(self.path, "rb") as f:
+            return f.read()
+
+    def cleanup(self):
+        """Removes the temporary file (a workbook written to an explicit path is kept)."""
+        if self._temporary:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+
+
+def workbook_bytes(sheets, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """{sheet name: DataFrame} -> .xlsx bytes, built through a temporary constant-memory workbook."""
+    with StreamingWorkbook(chunk_rows=chunk_rows) as workbook:
+        for sheet_name, df in sheets.items():
+            workbook.write_frame(sheet_name, df)
+        return workbook.read_bytes()
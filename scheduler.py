@@ -0,0 +1,399 @@
+"""
+Built-in, cross-platform report scheduler (replaces Windows schtasks).
+
+Jobs live in schedule.json as cron rules ("min hour day-of-month month day-of-week",
+local time) and run in-process, so a run pays no interpreter or import start-up.
+Missed runs are caught up once on the next tick, a lock file per job stops two
+schedulers (e.g. the control panel and a standalone daemon) running the same job at
+once, and every run is appended to schedule_history.jsonl with its duration.
+
+    python scheduler.py                  # run the daemon
+    python scheduler.py --run-now visa   # run one job immediately
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+SCHEDULE_FILE = "schedule.json"
+HISTORY_FILE = "schedule_history.jsonl"
+LOCK_DIR = "locks"
+TICK_SECONDS = 30
+# A run that is this late counts as a missed run (catch-up) rather than an on-time one
+LATE_AFTER = timedelta(minutes=2)
+# A running job touches its lock this often; one untouched for STALE_LOCK_SECONDS belongs to a crashed run
+LOCK_HEARTBEAT_SECONDS = 30
+STALE_LOCK_SECONDS = 4 * LOCK_HEARTBEAT_SECONDS
+DAY_NAMES = ["SUN", "MON", "TUE", "WED", "THU", "FRI", "SAT"]
+
+
+class CronRule:
+    """Five-field cron expression supporting *, lists, ranges, steps and day names (0 or 7 = Sunday)."""
+
+    RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+    def __init__(self, expression):
+        self.expression = expression
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron rule needs 5 fields (min hour dom month dow): {expression!r}")
+        parsed = [self._parse(field, low, high) for field, (low, high) in zip(fields, self.RANGES)]
+        self.minutes, self.hours, self.days, self.months, weekdays = parsed
+        self.weekdays = {day % 7 for day in weekdays}
+        # Standard cron: when both day fields are restricted, either one matching is enough
+        self._dom_any = fields[2] == "*"
+        self._dow_any = fields[4] == "*"
+
+    @staticmethod
+    def _parse(field, low, high):
+        values = set()
+        for part in field.upper().split(","):
+            for i, name in enumerate(DAY_NAMES):
+                part = part.replace(name, str(i))
+            step = 1
+            if "/" in part:
+                part, step = part.split("/")
+                step = int(step)
+            if part == "*":
+                start, end = low, high
+            elif "-" in part:
+                start, end = map(int, part.split("-"))
+            else:
+                start = end = int(part)
+            if not (low <= start <= high and low <= end <= high) or step < 1:
+                raise ValueError(f"Cron field {field!r} is out of range {low}-{high}")
+            values.update(range(start, end + 1, step))
+        return values
+
+    def _day_matches(self, dt):
+        dom = dt.day in self.days
+        dow = (dt.weekday() + 1) % 7 in self.weekdays
+        if self._dom_any or self._dow_any:
+            return dom and dow
+        return dom or dow
+
+    def next_after(self, dt):
+        """The first matching minute strictly after `dt`."""
+        dt = dt.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = dt + timedelta(days=366 * 5)
+        while dt < limit:
+            if dt.month not in self.months:
+                dt = (dt.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(dt):
+                dt = dt.replace(hour=0, minute=0) + timedelta(days=1)
+            elif dt.hour not in self.hours:
+                dt = dt.replace(minute=0) + timedelta(hours=1)
+            elif dt.minute not in self.minutes:
+                dt += timedelta(minutes=1)
+            else:
+                return dt
+        raise ValueError(f"Cron rule {self.expression!r} never fires")
+
+
+def weekly_rule(day, at):
+    """Cron rule for the control panel's "every <day> at <time>" form."""
+    return f"{at.minute} {at.hour} * * {day}"
+
+
+# --- Job types ----------------------------------------------------------------
+# Each takes the current config.json contents and returns {"success": bool, "message": str}
+
+def _run_visa_report(config):
+    from app_automated import run_visa_report
+    return run_visa_report(config)
+
+
+def _run_report_pipeline(config):
+    # Every registered report from one shared fetch (config "pipeline_reports" narrows the set)
+    from app_automated import run_report_pipeline
+    return run_report_pipeline(config, config.get("pipeline_reports"))
+
+
+def _run_prefetch(config):
+    from prefetch_service import PrefetchService, DATASETS
+    service = PrefetchService(config)
+    refreshed = [dataset for dataset in DATASETS if service.refresh(dataset)]
+    return {"success": len(refreshed) == len(DATASETS), "message": f"Refreshed: {', '.join(refreshed) or 'nothing'}"}
+
+
+def _run_outbox(config):
+    # Retries emails a failed or interrupted run left in the outbox
+    from mail_outbox import Outbox
+    results = Outbox.from_config(config).deliver()
+    sent = sum(result["status"] == "sent" for result in results.values())
+    return {"success": sent == len(results), "message": f"Delivered {sent}/{len(results)} queued emails"}
+
+
+JOB_TYPES = {
+    "visa_report": _run_visa_report,
+    "report_pipeline": _run_report_pipeline,
+    "prefetch": _run_prefetch,
+    "outbox": _run_outbox,
+}
+
+
+def register_job_type(name, func):
+    """Makes another report available to the scheduler; func(config) -> {"success", "message"}."""
+    JOB_TYPES[name] = func
+
+
+# --- Persistence ----------------------------------------------------------------
+
+def _write_json(path, data):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=4)
+    os.replace(tmp_path, path)
+
+
+def _load_config():
+    if os.path.exists("config.json"):
+        with open("config.json", "r") as f:
+            return json.load(f)
+    return {}
+
+
+class Scheduler:
+    """
+    Persistent cron-style jobs, run in-process.
+
+    A job is {"name", "cron", "job_type", "enabled", "catch_up", "created_at", "last_run_at"}.
+    On each tick a job whose next fire time (after its last run) has passed is run once.
+    If that time is more than LATE_AFTER ago the run is recorded as a catch-up, or skipped
+    when the job has catch_up off, so a machine that slept over several slots runs once,
+    not once per slot.
+    """
+
+    def __init__(self, schedule_path=SCHEDULE_FILE, history_path=HISTORY_FILE, lock_dir=LOCK_DIR,
+                 config_loader=_load_config):
+        self.schedule_path = schedule_path
+        self.history_path = history_path
+        self.lock_dir = lock_dir
+        self.config_loader = config_loader
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    # --- Job definitions ------------------------------------------------------
+
+    def jobs(self):
+        if not os.path.exists(self.schedule_path):
+            return []
+        with open(self.schedule_path, "r") as f:
+            return json.load(f).get("jobs", [])
+
+    def _save_jobs(self, jobs):
+        _write_json(self.schedule_path, {"jobs": jobs})
+
+    def _update_job(self, name, **changes):
+        with self._lock:
+            jobs = self.jobs()
+            for job in jobs:
+                if job["name"] == name:
+                    job.update(changes)
+            self._save_jobs(jobs)
+
+    def add_job(self, name, cron, job_type="visa_report", enabled=True, catch_up=True):
+        # Validates the expression and rejects rules that never fire (e.g. 30 February)
+        CronRule(cron).next_after(datetime.now())
+        if job_type not in JOB_TYPES:
+            raise ValueError(f"Unknown job type {job_type!r}; known: {sorted(JOB_TYPES)}")
+        with self._lock:
+            jobs = [job for job in self.jobs() if job["name"] != name]
+            jobs.append({
+                "name": name, "cron": cron, "job_type": job_type, "enabled": enabled,
+                "catch_up": catch_up, "created_at": time.time(), "last_run_at": None,
+            })
+            self._save_jobs(jobs)
+
+    def remove_job(self, name):
+        with self._lock:
+            self._save_jobs([job for job in self.jobs() if job["name"] != name])
+
+    def set_enabled(self, name, enabled):
+        self._update_job(name, enabled=enabled)
+
+    def next_run(self, job):
+        if not job.get("enabled"):
+            return None
+        since = datetime.fromtimestamp(job.get("last_run_at") or job["created_at"])
+        return CronRule(job["cron"]).next_after(since)
+
+    # --- History --------------------------------------------------------------
+
+    def history(self, limit=50):
+        """The most recent runs, newest first."""
+        if not os.path.exists(self.history_path):
+            return []
+        with open(self.history_path, "r") as f:
+            lines = f.readlines()[-limit:]
+        entries = []
+        for line in reversed(lines):
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                continue
+        return entries
+
+    def _record(self, entry):
+        with self._lock:
+            with open(self.history_path, "a") as f:
+                f.write(json.dumps(entry) + "\n")
+
+    # --- Locking --------------------------------------------------------------
+
+    def _lock_path(self, name):
+        safe = "".join(c if c.isalnum() or c in "-_" else "_" for c in name)
+        return os.path.join(self.lock_dir, f"{safe}.lock")
+
+    def _acquire(self, name):
+        """Creates the job's lock file; a stale lock from a crashed run is taken over."""
+        os.makedirs(self.lock_dir, exist_ok=True)
+        path = self._lock_path(name)
+        for _ in range(2):
+            try:
+                fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(path) < STALE_LOCK_SECONDS:
+                        return False
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                continue
+            with os.fdopen(fd, "w") as f:
+                json.dump({"pid": os.getpid(), "started_at": time.time()}, f)
+            return True
+        return False
+
+    def _release(self, name):
+        try:
+            os.remove(self._lock_path(name))
+        except FileNotFoundError:
+            pass
+
+    def _heartbeat(self, name, stop):
+        # Keeps a long run's lock fresh, so only a lock whose process died goes stale
+        while not stop.wait(LOCK_HEARTBEAT_SECONDS):
+            try:
+                os.utime(self._lock_path(name))
+            except FileNotFoundError:
+                return
+
+    # --- Running --------------------------------------------------------------
+
+    def run_job(self, name, trigger="manual", due=None):
+        """
+        Runs one job now under its lock. Returns the history entry, or None if it was already
+        running or, for a scheduled slot `due`, another scheduler has already run that slot.
+        """
+        if not any(job["name"] == name for job in self.jobs()):
+            raise KeyError(f"No scheduled job named {name!r}")
+        if not self._acquire(name):
+            return None
+
+        stop_heartbeat = threading.Event()
+        started = time.time()
+        try:
+            # Re-read under the lock: a scheduler that decided "due" before another one ran
+            # and released the job must not run the same slot again
+            job = next((job for job in self.jobs() if job["name"] == name), None)
+            if job is None or (due is not None and (job.get("last_run_at") or 0) >= due.timestamp()):
+                return None
+            threading.Thread(target=self._heartbeat, args=(name, stop_heartbeat), daemon=True).start()
+            # Marked before running so a slow job is not picked up again by the next tick
+            self._update_job(name, last_run_at=started)
+            try:
+                result = JOB_TYPES[job["job_type"]](self.config_loader()) or {}
+            except Exception as e:
+                result = {"success": False, "message": f"Error: {e}"}
+            finished = time.time()
+            entry = {
+                "job": name,
+                "job_type": job["job_type"],
+                "trigger": trigger,
+                "started_at": started,
+                "finished_at": finished,
+                "duration_seconds": round(finished - started, 1),
+                "success": bool(result.get("success")),
+                "message": result.get("message"),
+            }
+            self._record(entry)
+            return entry
+        finally:
+            stop_heartbeat.set()
+            self._release(name)
+
+    def tick(self, now=None):
+        """Runs every job that is due; returns the history entries of the runs made."""
+        now = now or datetime.now()
+        runs = []
+        for job in self.jobs():
+            # One broken job (a bad rule, a missing lock directory) must not hold up the rest
+            try:
+                entry = self._tick_job(job, now)
+            except Exception as e:
+                print(f"Scheduled job {job.get('name')!r} failed: {e}")
+                continue
+            if entry:
+                runs.append(entry)
+        return runs
+
+    def _tick_job(self, job, now):
+        due = self.next_run(job)
+        if due is None or due > now:
+            return None
+        if now - due <= LATE_AFTER:
+            trigger = "scheduled"
+        elif job.get("catch_up", True):
+            trigger = "catch-up"
+        else:
+            self._update_job(job["name"], last_run_at=now.timestamp())
+            self._record({"job": job["name"], "job_type": job["job_type"], "trigger": "skipped",
+                          "started_at": now.timestamp(), "finished_at": now.timestamp(),
+                          "duration_seconds": 0, "success": True,
+                          "message": f"Missed run due {due:%d %b %H:%M} skipped (catch-up off)"})
+            return None
+        return self.run_job(job["name"], trigger=trigger, due=due)
+
+    def run_forever(self):
+        while not self._stop.is_set():
+            try:
+                self.tick()
+            except Exception as e:
+                print(f"Scheduler tick failed: {e}")
+            self._stop.wait(TICK_SECONDS)
+
+    def start(self):
+        """Runs the scheduler loop on a daemon thread."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self.run_forever, name="report-scheduler", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run scheduled reports in-process")
+    parser.add_argument("--run-now", metavar="JOB", help="Run one job immediately and exit")
+    args = parser.parse_args()
+
+    scheduler = Scheduler()
+    if args.run_now:
+        entry = scheduler.run_job(args.run_now)
+        print(entry if entry else f"{args.run_now} is already running elsewhere.")
+        return
+    print(f"Scheduler running {len(scheduler.jobs())} jobs from {SCHEDULE_FILE}. Ctrl+C to stop.")
+    try:
+        scheduler.run_forever()
+    except KeyboardInterrupt:
+        scheduler.stop()
+
+
+if __name__ == "__main__":
+    main()
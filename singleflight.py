@@ -0,0 +1,153 @@
+import threading
+import time
+
+DEFAULT_RESULT_TTL_SECONDS = 60
+
+
+class Flight:
+    """
+    One execution of a piece of work and the ordered events it published.
+
+    Every subscriber replays the events from the start and then follows new ones as they
+    arrive, so someone joining half-way still sees the full progress and record stream.
+    Events of a `transient` kind (e.g. live table batches) are the exception: they are
+    dropped once every current subscriber has received them, and once the work is done,
+    so a finished flight only holds what a late subscriber actually needs.
+    """
+
+    def __init__(self, key, transient=()):
+        self.key = key
+        self.transient = frozenset(transient)
+        self.started_at = time.time()
+        self.finished_at = None
+        self.error = None
+        self.subscribers = 0
+        self._events = []
+        # Events consumed by each subscriber still following, and how far transient ones are dropped
+        self._positions = {}
+        self._trimmed = 0
+        self._done = False
+        self._cond = threading.Condition()
+
+    @property
+    def done(self):
+        return self._done
+
+    def publish(self, kind, payload):
+        with self._cond:
+            self._events.append((kind, payload))
+            self._cond.notify_all()
+
+    def finish(self, error=None):
+        with self._cond:
+            self.error = error
+            self.finished_at = time.time()
+            self._done = True
+            self._trim()
+            self._cond.notify_all()
+
+    def _trim(self):
+        # Called with the lock held. Delivered transient events become None (indexes stay valid)
+        if self._positions:
+            limit = min(self._positions.values())
+        elif self._done:
+            limit = len(self._events)
+        else:
+            return  # nobody has subscribed yet: keep everything for the first subscriber
+        if not self.transient:
+            return
+        for i in range(self._trimmed, limit):
+            event = self._events[i]
+            if event is not None and event[0] in self.transient:
+                self._events[i] = None
+        self._trimmed = max(self._trimmed, limit)
+
+    def subscribe(self):
+        """Yields (kind, payload) events; raises the work's exception once the events run out."""
+        token = object()
+        with self._cond:
+            self.subscribers += 1
+            self._positions[token] = 0
+        index = 0
+        try:
+            while True:
+                with self._cond:
+                    self._cond.wait_for(lambda: index < len(self._events) or self._done)
+                    pending = self._events[index:]
+                    index += len(pending)
+                    finished = self._done and index == len(self._events)
+                    self._positions[token] = index
+                    self._trim()
+                yield from (event for event in pending if event is not None)
+                if finished:
+                    break
+        finally:
+            with self._cond:
+                del self._positions[token]
+                self._trim()
+        if self.error is not None:
+            raise self.error
+
+
+class SingleFlight:
+    """
+    Process-wide coalescing of identical work (e.g. two dashboard users fetching the same
+    tenant at once). The first caller for a key starts the work on a background thread;
+    callers arriving while it runs join the same Flight, and a successful flight keeps
+    serving its recorded events for `ttl` seconds afterwards. Failed flights are dropped
+    straight away so the next caller retries. Event kinds in `transient` are not kept for
+    replay (see Flight).
+    """
+
+    def __init__(self, ttl=DEFAULT_RESULT_TTL_SECONDS, transient=()):
+        self.ttl = ttl
+        self.transient = tuple(transient)
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def join(self, key, work, ttl=None):
+        """
+        Returns the Flight for `key`, starting `work(publish)` if no live or fresh one exists.
+        `work` receives publish(kind, payload) and runs to completion even if every
+        subscriber stops listening, so its result can still be reused within the TTL.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        with self._lock:
+            self._prune(ttl)
+            flight = self._flights.get(key)
+            if flight is not None and self._reusable(flight, ttl):
+                return flight
+            flight = self._flights[key] = Flight(key, transient=self.transient)
+
+        def run():
+            try:
+                work(flight.publish)
+            except Exception as e:
+                flight.finish(e)
+                with self._lock:
+                    if self._flights.get(key) is flight:
+                        del self._flights[key]
+            else:
+                flight.finish()
+
+        threading.Thread(target=run, name=f"singleflight-{key!r}"[:60], daemon=True).start()
+        return flight
+
+    def _prune(self, ttl):
+        # Expired results would otherwise hold their records until the same key came back
+        for key, flight in list(self._flights.items()):
+            if not self._reusable(flight, ttl):
+                del self._flights[key]
+
+    @staticmethod
+    def _reusable(flight, ttl):
+        if not flight.done:
+            return True
+        return flight.error is None and time.time() - flight.finished_at < ttl
+
+    def forget(self, key):
+        """Drops a finished flight so the next join starts fresh work."""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None and flight.done:
+                del self._flights[key]